@@ -0,0 +1,83 @@
+"""Burst load test for request coalescing on GET /jobs.
+
+Seeds a throwaway SQLite database, then fires bursts of identical
+concurrent GET /jobs requests and reports how many database executions
+the single-flight layer saved:
+
+    python bench_coalescing.py --jobs 20000 --clients 50 --bursts 5
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+
+def seed(app, count):
+    from sqlalchemy import insert
+    from models import db, Job
+    from migrations import init_db
+    
+    with app.app_context():
+        init_db()
+        rows = [
+            {
+                'title': f'Actuary {i}',
+                'company': f'Company {i % 500}',
+                'location': ('London', 'Chicago, IL', 'Remote', 'Zurich')[i % 4],
+                'description': 'Pricing and reserving role ' * 10,
+                'url': f'https://example.com/jobs/{i}',
+            }
+            for i in range(count)
+        ]
+        db.session.execute(insert(Job), rows)
+        db.session.commit()
+
+def burst(app, clients, query):
+    """Release all clients at once and return the burst's wall time."""
+    barrier = threading.Barrier(clients)
+    errors = []
+    
+    def client():
+        test_client = app.test_client()
+        barrier.wait()
+        response = test_client.get(f'/jobs{query}')
+        if response.status_code != 200:
+            errors.append(response.status_code)
+    
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    if errors:
+        raise RuntimeError(f"{len(errors)} requests failed: {errors[:5]}")
+    return time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--jobs', type=int, default=20000, help='rows to seed')
+    parser.add_argument('--clients', type=int, default=50, help='concurrent requests per burst')
+    parser.add_argument('--bursts', type=int, default=5, help='number of bursts')
+    parser.add_argument('--query', default='?sort_by=company', help='query string sent by every client')
+    args = parser.parse_args()
+    
+    directory = tempfile.mkdtemp(prefix='coalescing-bench-')
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(directory, 'bench.db')}"
+    os.environ.pop('READ_MODEL_ENABLED', None)
+    
+    from app import create_app
+    app = create_app()
+    seed(app, args.jobs)
+    
+    timings = [burst(app, args.clients, args.query) for _ in range(args.bursts)]
+    stats = app.extensions['jobs_single_flight'].stats()
+    
+    print(f"requests:   {stats['requests']}")
+    print(f"executions: {stats['executions']}")
+    print(f"coalesced:  {stats['coalesced']} ({stats['saved_ratio']:.0%} of requests shared a query)")
+    print(f"burst wall time: median {sorted(timings)[len(timings) // 2] * 1000:.0f} ms")
+
+if __name__ == '__main__':
+    main()
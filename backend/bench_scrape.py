@@ -0,0 +1,92 @@
+"""End-to-end scrape benchmark against the local stand-in server.
+
+Starts stand_in_server.StandInServer, then runs the same ingestion pass
+as scraper.scrape_with_requests into a throwaway SQLite database, and
+reports throughput, per-stage timings and database write rates. The first
+run inserts every listing; later runs merge into the existing rows:
+
+    python bench_scrape.py --pages 50 --latency 0.05 --jitter 0.05 --error-rate 0.02
+    python bench_scrape.py --pages 50 --threads --fetch-workers 16
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from stand_in_server import add_server_arguments, server_from_args
+
+def scrape_once(app, base_url, pages, options):
+    """Ingest every listing page once, without a rate limit."""
+    from pipeline import run_pipeline
+    from sources.actuarylist import ActuaryListSource
+    
+    source = ActuaryListSource(base_url=base_url, pages=pages, rate_limit=0)
+    return run_pipeline(app, source=source, **options)
+
+def table_counts(app):
+    from models import db, Job, JobDescription
+    
+    with app.app_context():
+        return {
+            'jobs': db.session.query(Job).count(),
+            'job_descriptions': db.session.query(JobDescription).count(),
+        }
+
+def print_report(run, report, counts, elapsed):
+    stages = report['stages']
+    staged = stages['stage']
+    merged = stages['merge']
+    status = 'merged' if report['complete'] else 'discarded (incomplete)'
+    print(f"run {run}: {report['pages']} pages, {report['jobs_parsed']} jobs parsed, "
+          f"{report['jobs_added']} added, {report['jobs_expired']} expired, {status} in {elapsed:.2f} s "
+          f"({report['jobs_per_second']:.0f} jobs/s)")
+    for name, stage in stages.items():
+        print(f"  {name:<8} items {stage['items']:>6}  errors {stage['errors']:>4}  "
+              f"wall {stage['wall_seconds']:>8.3f} s  cpu {stage['cpu_seconds']:>8.3f} s")
+    if staged['wall_seconds']:
+        print(f"  db writes: {staged['items'] / staged['wall_seconds']:.0f} rows staged/s", end='')
+        if merged['wall_seconds']:
+            print(f", {merged['items'] / merged['wall_seconds']:.0f} rows merged/s", end='')
+        print()
+    print(f"  stored: {counts['jobs']} jobs, {counts['job_descriptions']} descriptions")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    add_server_arguments(parser)
+    parser.add_argument('--runs', type=int, default=3, help='scrape passes; the first includes pool start-up')
+    parser.add_argument('--fetch-workers', type=int, default=4, help='concurrent page fetches')
+    parser.add_argument('--parse-workers', type=int, default=None, help='parse workers (default: CPU count)')
+    parser.add_argument('--batch-size', type=int, default=200, help='jobs staged per transaction')
+    parser.add_argument('--threads', action='store_true', help='parse on threads instead of processes')
+    args = parser.parse_args()
+    
+    directory = tempfile.mkdtemp(prefix='scrape-bench-')
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(directory, 'bench.db')}"
+    os.environ.pop('DATABASE_REPLICA_URLS', None)
+    
+    from app import create_app
+    from migrations import init_db
+    
+    app = create_app()
+    with app.app_context():
+        init_db()
+    
+    options = {
+        'fetch_workers': args.fetch_workers,
+        'parse_workers': args.parse_workers,
+        'batch_size': args.batch_size,
+        'use_processes': not args.threads,
+    }
+    
+    with server_from_args(args) as server:
+        print(f"stand-in at {server.base_url}: {args.pages} pages, latency {args.latency}+{args.jitter} s, "
+              f"error rate {args.error_rate:.0%}")
+        for run in range(1, args.runs + 1):
+            start = time.perf_counter()
+            report = scrape_once(app, server.base_url, args.pages, options)
+            elapsed = time.perf_counter() - start
+            print_report(run, report, table_counts(app), elapsed)
+        print(f"server: {server.requests} requests, {server.errors} injected errors")
+
+if __name__ == '__main__':
+    main()
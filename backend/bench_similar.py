@@ -0,0 +1,99 @@
+"""Similar-jobs index benchmark on synthetic listings.
+
+Builds similar.SimilarityIndex in memory from --jobs listings made by
+recombining the titles, tags and description words of the bundled
+actuarylist page, then reports build time, memory and the latency of
+similar() for random jobs, before and after a batch of incremental adds:
+
+    python bench_similar.py --jobs 100000 --queries 500
+"""
+import argparse
+import os
+import random
+import statistics
+import time
+from types import SimpleNamespace
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+PAGE = os.path.join(HERE, 'actuarylist_full_page.html')
+
+def sample_listings():
+    """Return (title, tags, description) of the listings on the bundled page."""
+    from ingest import parse_page
+    
+    with open(PAGE, encoding='utf-8') as f:
+        jobs, _ = parse_page(f.read())
+    return [(job['title'], job.get('tags') or '', job['description']) for job in jobs]
+
+def synthetic_rows(count, seed):
+    """Yield (id, title, tags, description, duplicate_of) rows mixing the samples."""
+    rng = random.Random(seed)
+    samples = sample_listings()
+    title_words = sorted({word for title, _, _ in samples for word in title.split()})
+    tags = sorted({tag.strip() for _, tag_list, _ in samples for tag in tag_list.split(',') if tag.strip()})
+    description_words = [word for _, _, description in samples for word in description.split()]
+    for job_id in range(1, count + 1):
+        title, _, _ = rng.choice(samples)
+        yield (
+            job_id,
+            f"{title} {' '.join(rng.sample(title_words, 2))}",
+            ', '.join(rng.sample(tags, rng.randint(2, 6))),
+            ' '.join(rng.choices(description_words, k=rng.randint(30, 80))),
+            None,
+        )
+
+def time_queries(index, count, rng, limit):
+    """Return per-query latencies in milliseconds for random indexed jobs."""
+    job_ids = [int(job_id) for job_id in index.ids]
+    timings = []
+    for _ in range(count):
+        job = SimpleNamespace(id=rng.choice(job_ids), duplicate_of=None)
+        start = time.perf_counter()
+        index.similar(job, limit)
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+def print_latency(label, timings):
+    timings = sorted(timings)
+    p99 = timings[min(len(timings) - 1, int(len(timings) * 0.99))]
+    print(f"{label}: median {statistics.median(timings):.2f} ms, p99 {p99:.2f} ms, max {timings[-1]:.2f} ms")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--jobs', type=int, default=100000, help='synthetic jobs indexed')
+    parser.add_argument('--queries', type=int, default=500, help='similar() calls timed')
+    parser.add_argument('--limit', type=int, default=10, help='results per query')
+    parser.add_argument('--adds', type=int, default=500, help='jobs added incrementally after the build')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+    
+    from similar import SimilarityIndex
+    
+    rows = list(synthetic_rows(args.jobs + args.adds, args.seed))
+    index = SimilarityIndex(app=None, max_age=float('inf'))
+    
+    start = time.perf_counter()
+    index.load(rows[:args.jobs])
+    elapsed = time.perf_counter() - start
+    matrix_bytes = sum(
+        matrix.data.nbytes + matrix.indices.nbytes + matrix.indptr.nbytes
+        for matrix in (index.rows, index.columns)
+    )
+    print(f"built {args.jobs} jobs in {elapsed:.2f} s: {index.rows.nnz} stored weights, "
+          f"{matrix_bytes / 2**20:.0f} MiB of matrices")
+    
+    rng = random.Random(args.seed)
+    print_latency("similar()", time_queries(index, args.queries, rng, args.limit))
+    
+    added = [
+        {'id': job_id, 'title': title, 'tags': tags.split(', '), 'description': description}
+        for job_id, title, tags, description, _ in rows[args.jobs:]
+    ]
+    start = time.perf_counter()
+    index.add(added)
+    elapsed = time.perf_counter() - start
+    print(f"added {len(added)} jobs in {elapsed * 1000:.0f} ms ({len(index.pending)} pending)")
+    print_latency("similar() with pending", time_queries(index, args.queries, rng, args.limit))
+
+if __name__ == '__main__':
+    main()
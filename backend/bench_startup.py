@@ -0,0 +1,71 @@
+"""Measure worker startup cost of the Flask app.
+
+Each scenario runs in a fresh interpreter so import caches do not carry
+over. "eager" reproduces the old module layout, where importing app.py
+also imported the whole scraper stack:
+
+    python bench_startup.py --runs 10
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+SCENARIOS = {
+    'lazy': "import app; app.create_app()",
+    'eager': "import app; app.create_app(); import scraper",
+}
+
+PROBE = """
+import sys, time, json
+start = time.perf_counter()
+{code}
+elapsed = time.perf_counter() - start
+print(json.dumps({{"seconds": elapsed, "modules": len(sys.modules)}}))
+"""
+
+def run_scenario(code, runs):
+    """Run one scenario in fresh interpreters and collect timings."""
+    here = os.path.dirname(os.path.abspath(__file__))
+    env = dict(os.environ, DATABASE_URL=os.getenv('DATABASE_URL', 'sqlite://'))
+    samples = []
+    modules = 0
+    
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, '-c', PROBE.format(code=code)],
+            cwd=here, env=env, capture_output=True, text=True, check=True
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        samples.append(result['seconds'] * 1000)
+        modules = result['modules']
+    
+    return {
+        'median_ms': statistics.median(samples),
+        'min_ms': min(samples),
+        'max_ms': max(samples),
+        'modules': modules,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=10, help='fresh interpreters per scenario')
+    args = parser.parse_args()
+    
+    results = {name: run_scenario(code, args.runs) for name, code in SCENARIOS.items()}
+    
+    print(f"{'scenario':<10}{'median ms':>12}{'min ms':>10}{'max ms':>10}{'modules':>10}")
+    for name, result in results.items():
+        print(
+            f"{name:<10}{result['median_ms']:>12.1f}{result['min_ms']:>10.1f}"
+            f"{result['max_ms']:>10.1f}{result['modules']:>10}"
+        )
+    
+    saved = results['eager']['median_ms'] - results['lazy']['median_ms']
+    print(f"\nLazy scraper imports save {saved:.1f} ms per worker boot "
+          f"({saved / results['eager']['median_ms']:.0%}).")
+
+if __name__ == '__main__':
+    main()
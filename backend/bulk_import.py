@@ -0,0 +1,281 @@
+import csv
+import io
+import json
+import logging
+import os
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from sqlalchemy import insert, select
+from models import db, Job
+from descriptions import store_full_descriptions, summarize_description
+from dedup import content_fingerprint, duplicate_index, link_inserted_rows, minhash_signature, pack_signature
+from geo import gazetteer
+
+# Rows validated, deduplicated and inserted per transaction
+IMPORT_BATCH_SIZE = 1000
+
+# Batches at least this large are fingerprinted in the shared process pool
+# of pipeline.py when there is more than one CPU, the next batch while the
+# current one is inserted; smaller ones are not worth the round trips
+PARALLEL_MIN_ROWS = 200
+
+IMPORT_FIELDS = (
+    'title', 'company', 'location', 'description', 'url', 'date_posted', 'fingerprint', 'minhash',
+    'latitude', 'longitude',
+)
+
+def _column_limit(column):
+    return getattr(column.type, 'length', None)
+
+FIELD_LIMITS = {
+    'title': _column_limit(Job.title),
+    'company': _column_limit(Job.company),
+    'location': _column_limit(Job.location),
+    'url': _column_limit(Job.url),
+}
+
+def validate_row(data):
+    """Validate one imported job and return (row, error)."""
+    if not isinstance(data, dict):
+        return None, "Row must be a JSON object"
+    
+    row = {}
+    for field in ('title', 'company', 'location', 'description', 'url'):
+        value = data.get(field)
+        if value is None:
+            row[field] = None
+            continue
+        if not isinstance(value, str):
+            return None, f"Field '{field}' must be a string"
+        value = value.strip()
+        limit = FIELD_LIMITS.get(field)
+        if limit and len(value) > limit:
+            return None, f"Field '{field}' exceeds {limit} characters"
+        row[field] = value
+    
+    if not row['title']:
+        return None, "Field 'title' is required"
+    if not row['company']:
+        return None, "Field 'company' is required"
+    
+    date_posted = data.get('date_posted')
+    if date_posted:
+        try:
+            row['date_posted'] = datetime.fromisoformat(str(date_posted))
+        except ValueError:
+            return None, "Field 'date_posted' must be an ISO 8601 date"
+    else:
+        row['date_posted'] = datetime.utcnow()
+    
+    return row, None
+
+def fingerprint_row(row):
+    """Summarize a validated row and add its fingerprint, MinHash signature and coordinates.
+    
+    Returns the row and its full description, which is stored compressed
+    in the side table after the insert.
+    """
+    full_description = row['description']
+    if full_description:
+        row['description'] = summarize_description(full_description)
+    description = full_description or row['description']
+    row['fingerprint'] = content_fingerprint(row['title'], row['company'], row['location'], description)
+    row['minhash'] = pack_signature(minhash_signature(row['title'], description))
+    point = gazetteer().locate(row['location'])
+    row['latitude'], row['longitude'] = point if point else (None, None)
+    return row, full_description
+
+def import_executor():
+    """The process pool for fingerprinting, or None to work inline."""
+    if (os.cpu_count() or 1) < 2:
+        return None
+    from pipeline import shared_process_pool
+    return shared_process_pool()
+
+def _drop_broken_pool(executor):
+    from pipeline import replace_broken_pool
+    replace_broken_pool(executor)
+
+def start_fingerprinting(batch):
+    """Start fingerprinting validated (line number, row) pairs.
+    
+    Returns what finish_fingerprinting() needs; the work runs in the
+    process pool for large batches and lazily on the caller's thread
+    otherwise.
+    """
+    rows = [row for _, row in batch]
+    executor = import_executor() if len(rows) >= PARALLEL_MIN_ROWS else None
+    if executor is not None:
+        try:
+            return batch, executor, executor.map(fingerprint_row, rows, chunksize=50)
+        except BrokenProcessPool:
+            _drop_broken_pool(executor)
+    return batch, None, map(fingerprint_row, rows)
+
+def finish_fingerprinting(started):
+    """Wait for a started batch; return (line number, row, full description) triples."""
+    batch, executor, results = started
+    try:
+        fingerprinted = list(results)
+    except BrokenProcessPool:
+        # Workers died mid-batch; the rows sent to them were copies
+        _drop_broken_pool(executor)
+        fingerprinted = [fingerprint_row(row) for _, row in batch]
+    return [
+        (line_number, row, full_description)
+        for (line_number, _), (row, full_description) in zip(batch, fingerprinted)
+    ]
+
+def existing_fingerprints(rows):
+    """Look up which fingerprints from a batch are already in the database."""
+    fingerprints = {row['fingerprint'] for row in rows}
+    stmt = select(Job.fingerprint).where(Job.fingerprint.in_(fingerprints))
+    return set(db.session.execute(stmt).scalars())
+
+def _copy_value(value):
+    if value is None:
+        return '\\N'
+    if isinstance(value, bytes):
+        return '\\x' + value.hex()
+    return value
+
+def with_column_defaults(rows, table, fields):
+    """Add the Python-side defaults of columns missing from fields.
+    
+    COPY bypasses SQLAlchemy, which would otherwise fill them (is_active,
+    last_seen_at, ...), so they are written explicitly. Returns the rows
+    and the extended field list.
+    """
+    defaults = {
+        column.name: column.default for column in table.columns
+        if column.name not in fields and column.default is not None
+        and (column.default.is_scalar or column.default.is_callable)
+    }
+    if not defaults:
+        return rows, fields
+    values = {
+        name: default.arg(None) if default.is_callable else default.arg
+        for name, default in defaults.items()
+    }
+    return [{**values, **row} for row in rows], tuple(fields) + tuple(values)
+
+def copy_rows(rows, table=None, fields=IMPORT_FIELDS):
+    """Insert rows with PostgreSQL COPY through the session's connection."""
+    table = Job.__table__ if table is None else table
+    rows, fields = with_column_defaults(rows, table, fields)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow([_copy_value(row[field]) for field in fields])
+    buffer.seek(0)
+    
+    dbapi_connection = db.session.connection().connection
+    with dbapi_connection.cursor() as cursor:
+        cursor.copy_expert(
+            f"COPY {table.name} ({', '.join(fields)}) "
+            "FROM STDIN WITH (FORMAT csv, NULL '\\N')",
+            buffer
+        )
+
+def insert_rows(rows, model=Job, fields=IMPORT_FIELDS):
+    """Insert a batch using COPY on psycopg2 and executemany elsewhere.
+    
+    Rows are dicts keyed by fields, which must be columns of model.
+    """
+    if db.engine.dialect.name == 'postgresql' and db.engine.dialect.driver == 'psycopg2':
+        copy_rows(rows, model.__table__, fields)
+    else:
+        db.session.execute(insert(model), rows)
+
+def flush_batch(batch, report):
+    """Deduplicate a batch by fingerprint and insert the new rows.
+    
+    A batch that fails is retried in halves, so one bad row only fails
+    itself and the report names it.
+    """
+    try:
+        # Loaded before the insert so the new rows are clustered below
+        index = duplicate_index()
+        
+        known = existing_fingerprints([row for _, row, _ in batch])
+        new_rows = []
+        full_descriptions = {}
+        duplicates = 0
+        for line_number, row, full_description in batch:
+            if row['fingerprint'] in known:
+                duplicates += 1
+                continue
+            known.add(row['fingerprint'])
+            new_rows.append(row)
+            full_descriptions[row['fingerprint']] = full_description
+        
+        if new_rows:
+            insert_rows(new_rows)
+            link_inserted_rows(list(full_descriptions), index)
+            store_full_descriptions(full_descriptions)
+        db.session.commit()
+        report['inserted'] += len(new_rows)
+        report['duplicates'] += duplicates
+    except Exception as e:
+        db.session.rollback()
+        if len(batch) > 1:
+            middle = len(batch) // 2
+            flush_batch(batch[:middle], report)
+            flush_batch(batch[middle:], report)
+            return
+        line_number = batch[0][0]
+        logging.error(f"Error importing line {line_number}: {str(e)}")
+        report['errors'].append({"line": line_number, "error": f"Insert failed: {str(e)}"})
+
+def import_ndjson(lines, batch_size=IMPORT_BATCH_SIZE):
+    """Import newline-delimited JSON jobs and return a summary report.
+    
+    Invalid rows are reported by line number and skipped without
+    aborting the rest of the feed. Rows are fingerprinted a batch ahead of
+    the insert, in the process pool when there is more than one CPU.
+    """
+    report = {"received": 0, "inserted": 0, "duplicates": 0, "errors": []}
+    batch = []
+    # Batch being fingerprinted while the one before it is inserted
+    pending = None
+    
+    def advance(batch):
+        # Start fingerprinting batch, then insert the one started before it
+        nonlocal pending
+        started = start_fingerprinting(batch) if batch else None
+        if pending:
+            flush_batch(finish_fingerprinting(pending), report)
+        pending = started
+    
+    for line_number, line in enumerate(lines, start=1):
+        if isinstance(line, bytes):
+            line = line.decode('utf-8', errors='replace')
+        line = line.strip()
+        if not line:
+            continue
+        
+        report['received'] += 1
+        try:
+            data = json.loads(line)
+        except ValueError as e:
+            report['errors'].append({"line": line_number, "error": f"Invalid JSON: {str(e)}"})
+            continue
+        
+        row, error = validate_row(data)
+        if error:
+            report['errors'].append({"line": line_number, "error": error})
+            continue
+        
+        batch.append((line_number, row))
+        if len(batch) >= batch_size:
+            advance(batch)
+            batch = []
+    
+    advance(batch)
+    advance([])
+    
+    logging.info(
+        f"Bulk import: {report['received']} received, {report['inserted']} inserted, "
+        f"{report['duplicates']} duplicates, {len(report['errors'])} errors"
+    )
+    return report
@@ -0,0 +1,206 @@
+import itertools
+import logging
+import os
+import threading
+import time
+from flask import current_app, g, has_app_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError, ProgrammingError
+
+REPLICA_BIND_PREFIX = 'replica_'
+
+# Cookie that pins a client to the primary right after it wrote something
+READ_YOUR_WRITES_COOKIE = 'db_primary_until'
+
+WRITE_METHODS = {'POST', 'PUT', 'PATCH', 'DELETE'}
+
+def _env_int(name):
+    value = os.getenv(name)
+    return int(value) if value not in (None, '') else None
+
+def _env_bool(name, default):
+    value = os.getenv(name)
+    if value in (None, ''):
+        return default
+    return value.lower() in ('1', 'true', 'yes', 'on')
+
+def engine_options_from_env():
+    """Build SQLAlchemy pool settings from DB_POOL_* environment variables.
+    
+    Pre-ping and recycling are on by default so connections dropped by the
+    server or a proxy are replaced transparently; pool size and overflow
+    are only passed when set, leaving the driver defaults otherwise.
+    """
+    options = {
+        'pool_pre_ping': _env_bool('DB_POOL_PRE_PING', True),
+        'pool_recycle': _env_int('DB_POOL_RECYCLE') or 1800,
+    }
+    
+    for option, name in (
+        ('pool_size', 'DB_POOL_SIZE'),
+        ('max_overflow', 'DB_MAX_OVERFLOW'),
+        ('pool_timeout', 'DB_POOL_TIMEOUT'),
+    ):
+        value = _env_int(name)
+        if value is not None:
+            options[option] = value
+    
+    return options
+
+def replica_binds_from_env(engine_options):
+    """Build SQLALCHEMY_BINDS entries for DATABASE_REPLICA_URLS."""
+    urls = [url.strip() for url in os.getenv('DATABASE_REPLICA_URLS', '').split(',') if url.strip()]
+    return {
+        f'{REPLICA_BIND_PREFIX}{i}': dict(engine_options, url=url)
+        for i, url in enumerate(urls)
+    }
+
+class ReplicaSet:
+    """Round-robin selection over replica engines with health tracking.
+    
+    A replica that fails its probe or a query is skipped until the retry
+    interval passes, and reads fall back to the primary when none is
+    available.
+    """
+    
+    def __init__(self, bind_keys, health_interval=5, retry_interval=30):
+        self.bind_keys = list(bind_keys)
+        self.health_interval = health_interval
+        self.retry_interval = retry_interval
+        self._cycle = itertools.cycle(self.bind_keys) if self.bind_keys else None
+        self._checked_at = {}
+        self._down_until = {}
+        self._lock = threading.Lock()
+    
+    def _healthy(self, key, engine):
+        now = time.monotonic()
+        if self._down_until.get(key, 0) > now:
+            return False
+        if now - self._checked_at.get(key, 0) < self.health_interval:
+            return True
+        
+        try:
+            with engine.connect() as connection:
+                connection.execute(text('SELECT 1'))
+            self._checked_at[key] = now
+            return True
+        except Exception as e:
+            logging.warning(f"Replica {key} failed health check, using primary: {str(e)}")
+            self._down_until[key] = now + self.retry_interval
+            return False
+    
+    def pick(self, engines):
+        """Return the next healthy replica engine, or None for the primary."""
+        if not self._cycle:
+            return None
+        
+        with self._lock:
+            candidates = [next(self._cycle) for _ in self.bind_keys]
+        
+        for key in candidates:
+            engine = engines.get(key)
+            if engine is not None and self._healthy(key, engine):
+                return engine
+        return None
+    
+    def mark_down(self, engine, engines, error):
+        """Skip a replica whose query failed until the retry interval passes."""
+        for key, candidate in engines.items():
+            if candidate is engine:
+                logging.warning(f"Replica {key} failed a query, using primary: {str(error)}")
+                self._down_until[key] = time.monotonic() + self.retry_interval
+
+class RoutingSession(Session):
+    """Session that sends reads to a replica when the request allows it.
+    
+    Anything flushed or written inside the session always goes to the
+    primary; routing only applies when before_request marked the request
+    as read-only.
+    """
+    
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._flushing and has_app_context() and g.get('db_read_replica'):
+            # Pick once per request so every read sees the same replica
+            if 'db_replica_engine' not in g:
+                replicas = current_app.extensions.get('db_replicas')
+                g.db_replica_engine = replicas.pick(self._db.engines) if replicas else None
+            if g.db_replica_engine is not None:
+                return g.db_replica_engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+    
+    def _read_with_fallback(self, method, *args, **kwargs):
+        # A replica that is missing tables (e.g. never seeded) or dropped the
+        # connection mid-request fails the read over to the primary
+        try:
+            return method(*args, **kwargs)
+        except (OperationalError, ProgrammingError) as e:
+            engine = g.get('db_replica_engine') if has_app_context() else None
+            if engine is None:
+                raise
+            self.rollback()
+            current_app.extensions['db_replicas'].mark_down(engine, self._db.engines, e)
+            g.db_replica_engine = None
+            return method(*args, **kwargs)
+    
+    def execute(self, *args, **kwargs):
+        return self._read_with_fallback(super().execute, *args, **kwargs)
+    
+    def scalar(self, *args, **kwargs):
+        return self._read_with_fallback(super().scalar, *args, **kwargs)
+    
+    def scalars(self, *args, **kwargs):
+        return self._read_with_fallback(super().scalars, *args, **kwargs)
+
+def use_primary(view):
+    """Mark a GET view as writing, so it is never routed to a replica."""
+    view.use_primary = True
+    return view
+
+def _route_request():
+    g.db_read_replica = False
+    if request.method != 'GET' or request.endpoint is None:
+        return
+    
+    view = current_app.view_functions.get(request.endpoint)
+    if getattr(view, 'use_primary', False):
+        return
+    
+    # Keep a client that just wrote on the primary until replicas catch up
+    pinned_until = request.cookies.get(READ_YOUR_WRITES_COOKIE)
+    try:
+        if pinned_until and float(pinned_until) > time.time():
+            return
+    except ValueError:
+        pass
+    
+    g.db_read_replica = True
+
+def _pin_after_write(response):
+    window = current_app.config.get('DB_READ_YOUR_WRITES_SECONDS', 0)
+    if window and request.method in WRITE_METHODS and response.status_code < 400:
+        response.set_cookie(
+            READ_YOUR_WRITES_COOKIE,
+            str(time.time() + window),
+            max_age=int(window) + 1,
+            httponly=True,
+            samesite='Lax'
+        )
+    return response
+
+def init_routing(app):
+    """Enable replica routing for an app whose replica binds are configured."""
+    bind_keys = [
+        key for key in app.config.get('SQLALCHEMY_BINDS', {})
+        if key.startswith(REPLICA_BIND_PREFIX)
+    ]
+    app.extensions['db_replicas'] = ReplicaSet(
+        bind_keys,
+        health_interval=app.config.get('DB_REPLICA_HEALTH_INTERVAL', 5),
+        retry_interval=app.config.get('DB_REPLICA_RETRY_INTERVAL', 30)
+    )
+    app.before_request(_route_request)
+    app.after_request(_pin_after_write)
+    
+    if bind_keys:
+        logging.info(f"Routing read-only requests to {len(bind_keys)} replica(s)")
@@ -0,0 +1,361 @@
+import hashlib
+import logging
+import re
+import struct
+import threading
+from collections import defaultdict
+from functools import lru_cache
+from flask import current_app
+from sqlalchemy import bindparam, select, update
+from sqlalchemy.exc import IntegrityError
+from models import db, Job
+from descriptions import attach_full_description
+from geo import locate_job
+
+# MinHash signature length and its split into LSH bands. 16 bands of 4
+# rows put the candidate threshold around 0.5 Jaccard similarity, well
+# below NEAR_DUPLICATE_THRESHOLD, so true near duplicates are rarely missed.
+NUM_PERMUTATIONS = 64
+LSH_BANDS = 16
+LSH_ROWS = NUM_PERMUTATIONS // LSH_BANDS
+
+# Estimated Jaccard similarity above which two jobs are the same posting
+NEAR_DUPLICATE_THRESHOLD = 0.8
+
+SHINGLE_SIZE = 3
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+def _permutation_parameters():
+    # Derived from a fixed seed so stored signatures stay comparable
+    params = []
+    for i in range(NUM_PERMUTATIONS):
+        digest = hashlib.blake2b(f'minhash-{i}'.encode(), digest_size=16).digest()
+        a, b = struct.unpack('<QQ', digest)
+        params.append((a % (_MERSENNE_PRIME - 1) + 1, b % _MERSENNE_PRIME))
+    return params
+
+_PERMUTATIONS = _permutation_parameters()
+
+_NON_WORD = re.compile(r'[^a-z0-9]+')
+
+def normalize_text(value):
+    """Lowercase and strip punctuation so cosmetic edits compare equal."""
+    if not value:
+        return ''
+    return _NON_WORD.sub(' ', value.lower()).strip()
+
+def content_fingerprint(title, company, location, description):
+    """Return the SHA-256 fingerprint of a job's normalized content."""
+    parts = [normalize_text(part) for part in (title, company, location, description)]
+    return hashlib.sha256('\x1f'.join(parts).encode('utf-8')).hexdigest()
+
+def shingles(text):
+    """Return the set of word n-grams used for MinHash."""
+    words = normalize_text(text).split()
+    if len(words) < SHINGLE_SIZE:
+        return {' '.join(words)} if words else set()
+    return {' '.join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)}
+
+@lru_cache(maxsize=None)
+def _numpy_permutations():
+    """Permutation parameters as numpy arrays, or None without numpy."""
+    try:
+        import numpy as np
+    except ImportError:
+        return None
+    a = np.array([a for a, _ in _PERMUTATIONS], dtype=np.uint64)[:, None]
+    b = np.array([b for _, b in _PERMUTATIONS], dtype=np.uint64)[:, None]
+    return a >> np.uint64(32), a & np.uint64(_MAX_HASH), b
+
+def _minhash_numpy(digests, permutations):
+    """Vectorized (a * value + b) % _MERSENNE_PRIME, exact in 64-bit lanes.
+    
+    Operands are split into 32-bit halves and the partial products folded
+    with 2**61 == 1 (mod p), so signatures match the pure Python ones.
+    """
+    import numpy as np
+    
+    a_high, a_low, b = permutations
+    prime = np.uint64(_MERSENNE_PRIME)
+    values = np.frombuffer(digests, dtype='<u8') % prime
+    v_high, v_low = values >> np.uint64(32), values & np.uint64(_MAX_HASH)
+    
+    # a * v = high * 2**64 + middle * 2**32 + low, and 2**64 == 8 (mod p)
+    total = a_high * v_high
+    total <<= np.uint64(3)
+    middle = a_high * v_low
+    middle += a_low * v_high
+    total += middle >> np.uint64(29)
+    middle &= np.uint64((1 << 29) - 1)
+    middle <<= np.uint64(32)
+    total += middle
+    low = a_low * v_low
+    total += low & prime
+    low >>= np.uint64(61)
+    total += low
+    total += b
+    
+    # Two folds bring the sum (below 2**63) to at most p, which is 0 mod p
+    for _ in range(2):
+        carry = total >> np.uint64(61)
+        total &= prime
+        total += carry
+    total[total == prime] = 0
+    return (total.min(axis=1) & np.uint64(_MAX_HASH)).tolist()
+
+def minhash_signature(title, description):
+    """Compute the MinHash signature of a job's title and description."""
+    digests = b''.join(
+        hashlib.blake2b(shingle.encode('utf-8'), digest_size=8).digest()
+        for shingle in shingles(f'{title or ""} {description or ""}')
+    )
+    if not digests:
+        return None
+    
+    permutations = _numpy_permutations()
+    if permutations is not None:
+        return _minhash_numpy(digests, permutations)
+    hashes = struct.unpack(f'<{len(digests) // 8}Q', digests)
+    return [
+        min((a * value + b) % _MERSENNE_PRIME for value in hashes) & _MAX_HASH
+        for a, b in _PERMUTATIONS
+    ]
+
+def pack_signature(signature):
+    return struct.pack(f'<{NUM_PERMUTATIONS}I', *signature) if signature else None
+
+def unpack_signature(data):
+    return list(struct.unpack(f'<{NUM_PERMUTATIONS}I', data)) if data else None
+
+def estimated_similarity(first, second):
+    """Estimate Jaccard similarity from two MinHash signatures."""
+    return sum(1 for x, y in zip(first, second) if x == y) / NUM_PERMUTATIONS
+
+class NearDuplicateIndex:
+    """LSH buckets over MinHash signatures of stored jobs.
+    
+    Each new job is compared only against jobs that share at least one
+    band with it, and each stored job remembers the root of its duplicate
+    cluster so reposts of reposts collapse onto the original listing.
+    """
+    
+    def __init__(self):
+        self.buckets = defaultdict(set)
+        self.signatures = {}
+        self.roots = {}
+        self.max_id = 0
+        self.lock = threading.Lock()
+    
+    def _bands(self, signature):
+        for band in range(LSH_BANDS):
+            start = band * LSH_ROWS
+            yield (band, tuple(signature[start:start + LSH_ROWS]))
+    
+    def add(self, job_id, signature, duplicate_of=None):
+        if not signature:
+            return
+        self.signatures[job_id] = signature
+        self.roots[job_id] = duplicate_of or job_id
+        for key in self._bands(signature):
+            self.buckets[key].add(job_id)
+        self.max_id = max(self.max_id, job_id)
+    
+    def remove(self, job_id):
+        signature = self.signatures.pop(job_id, None)
+        self.roots.pop(job_id, None)
+        if signature:
+            for key in self._bands(signature):
+                self.buckets[key].discard(job_id)
+    
+    def find_duplicate(self, signature, exclude=None):
+        """Return (root job id, similarity) of the closest match, or None."""
+        if not signature:
+            return None
+        
+        candidates = set()
+        for key in self._bands(signature):
+            candidates |= self.buckets.get(key, set())
+        candidates.discard(exclude)
+        
+        best = None
+        for job_id in candidates:
+            similarity = estimated_similarity(signature, self.signatures[job_id])
+            if similarity >= NEAR_DUPLICATE_THRESHOLD and (best is None or similarity > best[1]):
+                best = (self.roots[job_id], similarity)
+        return best
+    
+    def refresh(self):
+        """Load signatures of jobs stored since the last refresh."""
+        stmt = (
+            select(Job.id, Job.minhash, Job.duplicate_of)
+            .where(Job.id > self.max_id, Job.minhash.isnot(None))
+            .order_by(Job.id)
+        )
+        for job_id, minhash, duplicate_of in db.session.execute(stmt):
+            self.add(job_id, unpack_signature(minhash), duplicate_of)
+
+def duplicate_index(app=None):
+    """Return the app's near-duplicate index, loading new rows first."""
+    app = app or current_app._get_current_object()
+    index = app.extensions.get('near_duplicates')
+    if index is None:
+        index = app.extensions.setdefault('near_duplicates', NearDuplicateIndex())
+    with index.lock:
+        index.refresh()
+    return index
+
+def reset_duplicate_index(app):
+    """Drop the in-memory index, e.g. after the jobs table was cleared."""
+    app.extensions.pop('near_duplicates', None)
+
+def fingerprint_job(job, full_description=None):
+    """Fill in the fingerprint and MinHash signature of a Job.
+    
+    Both are computed over the full description when it is known, since
+    the summary on the row can hide differences past its cut-off.
+    """
+    description = full_description or job.description
+    job.fingerprint = content_fingerprint(job.title, job.company, job.location, description)
+    job.minhash = pack_signature(minhash_signature(job.title, description))
+    return job
+
+def is_known_fingerprint(fingerprint):
+    """Check the unique fingerprint index for an exact duplicate."""
+    return db.session.scalar(select(Job.id).where(Job.fingerprint == fingerprint).limit(1)) is not None
+
+def link_near_duplicate(job, index):
+    """Point a new job at the cluster root of its closest near duplicate.
+    
+    The job must already be flushed so it has an id. Returns the root id
+    or None when the job starts a new cluster.
+    """
+    signature = unpack_signature(job.minhash)
+    with index.lock:
+        match = index.find_duplicate(signature, exclude=job.id)
+        if match and db.session.get(Job, match[0]) is None:
+            # The cluster root was deleted by another worker
+            index.remove(match[0])
+            match = None
+        
+        job.duplicate_of = match[0] if match else None
+        index.add(job.id, signature, job.duplicate_of)
+    
+    if match:
+        logging.info(f"Job {job.id} is a near duplicate of job {match[0]} ({match[1]:.2f} similar)")
+    return job.duplicate_of
+
+def add_job_if_new(job, index=None, full_description=None):
+    """Add a Job to the session unless an exact duplicate is stored.
+    
+    Jobs are fingerprinted unless the caller already did. New ones get
+    their compressed full description and coordinates, are flushed and are
+    linked to their near-duplicate cluster; the caller commits. Returns True when the job
+    was added.
+    """
+    # Load the index before flushing so it does not pick up this job
+    index = index or duplicate_index()
+    
+    if job.fingerprint is None:
+        fingerprint_job(job, full_description)
+    if is_known_fingerprint(job.fingerprint):
+        return False
+    attach_full_description(job, full_description)
+    if job.latitude is None:
+        locate_job(job)
+    
+    try:
+        with db.session.begin_nested():
+            db.session.add(job)
+    except IntegrityError:
+        # Another writer stored the same fingerprint in the meantime;
+        # any other constraint failure is the caller's to report
+        if is_known_fingerprint(job.fingerprint):
+            return False
+        raise
+    
+    link_near_duplicate(job, index)
+    return True
+
+def link_inserted_rows(fingerprints, index):
+    """Cluster rows written by a bulk insert, looked up by fingerprint.
+    
+    The index must have been loaded before the insert.
+    """
+    if not fingerprints:
+        return
+    rows = db.session.execute(
+        select(Job.id, Job.minhash).where(Job.fingerprint.in_(fingerprints)).order_by(Job.id)
+    ).all()
+    
+    links = []
+    with index.lock:
+        for job_id, minhash in rows:
+            signature = unpack_signature(minhash)
+            if job_id in index.signatures:
+                continue
+            match = index.find_duplicate(signature, exclude=job_id)
+            root = match[0] if match else None
+            index.add(job_id, signature, root)
+            if root:
+                links.append({'job_id': job_id, 'root': root})
+    
+    if links:
+        jobs = Job.__table__
+        db.session.execute(
+            update(jobs).where(jobs.c.id == bindparam('job_id')).values(duplicate_of=bindparam('root')),
+            links
+        )
+
+def release_duplicates(job_id, app=None):
+    """Promote the oldest duplicate of a deleted job to cluster root."""
+    app = app or current_app._get_current_object()
+    index = app.extensions.get('near_duplicates')
+    if index is not None:
+        with index.lock:
+            index.remove(job_id)
+    
+    new_root = db.session.scalar(
+        select(Job.id).where(Job.duplicate_of == job_id).order_by(Job.id).limit(1)
+    )
+    if new_root is None:
+        return
+    
+    db.session.execute(update(Job).where(Job.id == new_root).values(duplicate_of=None))
+    db.session.execute(update(Job).where(Job.duplicate_of == job_id).values(duplicate_of=new_root))
+    
+    # The in-memory roots are stale now; reload them on next use
+    app.extensions.pop('near_duplicates', None)
+
+def backfill_fingerprints(batch_size=500):
+    """Fingerprint and cluster rows stored before fingerprints existed."""
+    index = duplicate_index()
+    updated = 0
+    
+    while True:
+        jobs = db.session.execute(
+            select(Job).where(Job.fingerprint.is_(None), Job.minhash.is_(None))
+            .order_by(Job.id).limit(batch_size)
+        ).scalars().all()
+        if not jobs:
+            break
+        
+        for job in jobs:
+            fingerprint = content_fingerprint(job.title, job.company, job.location, job.description)
+            signature = minhash_signature(job.title, job.description)
+            job.minhash = pack_signature(signature) or b''
+            
+            existing = db.session.scalar(select(Job.id).where(Job.fingerprint == fingerprint).limit(1))
+            if existing is not None:
+                # Exact duplicate of an earlier row: keep it, but as a member of that cluster
+                job.duplicate_of = index.roots.get(existing, existing)
+            else:
+                job.fingerprint = fingerprint
+                db.session.flush()
+                link_near_duplicate(job, index)
+            updated += 1
+        
+        db.session.commit()
+    
+    return updated
@@ -0,0 +1,177 @@
+import logging
+import os
+import re
+import zlib
+from html.parser import HTMLParser
+from sqlalchemy import insert, select
+from models import db, Job, JobDescription
+
+# Length of the plain-text summary kept in the hot jobs table
+SUMMARY_LENGTH = 300
+
+ZLIB_LEVEL = 6
+ZSTD_LEVEL = 10
+
+_WHITESPACE = re.compile(r'\s+')
+
+# HTML is fed to the text extractor in chunks of this many characters, so
+# a summary stops parsing once it has enough text
+_FEED_CHUNK = 2048
+
+class _TextExtractor(HTMLParser):
+    """Collect the text of an HTML document like BeautifulSoup's
+    get_text(separator=' ', strip=True), without building a tree.
+    
+    Text inside script, style and template elements, comments and
+    declarations is left out; CDATA sections are kept.
+    """
+    
+    SKIPPED = frozenset(('script', 'style', 'template'))
+    
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.strings = []
+        self.pending = []
+        self.skipped = 0
+    
+    def _end_string(self):
+        # Adjacent data events are one string, as in BeautifulSoup
+        if self.pending:
+            string = ''.join(self.pending).strip()
+            if string:
+                self.strings.append(string)
+            self.pending = []
+    
+    def handle_starttag(self, tag, attrs):
+        self._end_string()
+        if tag in self.SKIPPED:
+            self.skipped += 1
+    
+    def handle_endtag(self, tag):
+        self._end_string()
+        if tag in self.SKIPPED and self.skipped:
+            self.skipped -= 1
+    
+    def handle_startendtag(self, tag, attrs):
+        self._end_string()
+    
+    def handle_data(self, data):
+        if not self.skipped:
+            self.pending.append(data)
+    
+    def handle_comment(self, data):
+        self._end_string()
+    
+    def handle_decl(self, decl):
+        self._end_string()
+    
+    def handle_pi(self, data):
+        self._end_string()
+    
+    def unknown_decl(self, data):
+        self._end_string()
+        if data.startswith('CDATA[') and not self.skipped:
+            self.pending.append(data[len('CDATA['):])
+            self._end_string()
+    
+    def text(self):
+        strings = self.strings
+        pending = ''.join(self.pending).strip()
+        return ' '.join(strings + [pending] if pending else strings)
+
+def html_text(html_content, limit=None):
+    """Return the plain text of HTML, stopping early once it is longer than limit.
+    
+    With a limit the result may be cut short, but it is always a prefix of
+    the full text.
+    """
+    parser = _TextExtractor()
+    for start in range(0, len(html_content), _FEED_CHUNK):
+        parser.feed(html_content[start:start + _FEED_CHUNK])
+        if limit is not None and len(parser.text()) > limit:
+            return parser.text()
+    parser.close()
+    return parser.text()
+
+def summarize_description(html_content):
+    """Reduce a description to a short plain-text summary."""
+    if not html_content:
+        return "No description available"
+    
+    if '<' in html_content:
+        text = html_text(html_content, limit=SUMMARY_LENGTH)
+    else:
+        text = _WHITESPACE.sub(' ', html_content).strip()
+    
+    # Limit to a reasonable length for the summary
+    if len(text) > SUMMARY_LENGTH:
+        text = text[:SUMMARY_LENGTH - 3] + "..."
+    
+    return text
+
+def _zstd():
+    try:
+        import zstandard
+        return zstandard
+    except ImportError:
+        return None
+
+def default_codec():
+    """Pick zstd when DESCRIPTION_CODEC asks for it and it is installed."""
+    codec = os.getenv('DESCRIPTION_CODEC', 'zlib').lower()
+    if codec == 'zstd' and _zstd() is None:
+        logging.warning("DESCRIPTION_CODEC=zstd but zstandard is not installed, using zlib")
+        return 'zlib'
+    return codec if codec in ('zlib', 'zstd') else 'zlib'
+
+def compress_description(text, codec=None):
+    """Compress a description and return (codec, data, size)."""
+    codec = codec or default_codec()
+    raw = text.encode('utf-8')
+    if codec == 'zstd':
+        data = _zstd().ZstdCompressor(level=ZSTD_LEVEL).compress(raw)
+    else:
+        data = zlib.compress(raw, ZLIB_LEVEL)
+    return codec, data, len(raw)
+
+def decompress_description(record):
+    """Return the original text of a JobDescription."""
+    if record.codec == 'zstd':
+        zstandard = _zstd()
+        if zstandard is None:
+            raise RuntimeError("Description is zstd-compressed but zstandard is not installed")
+        raw = zstandard.ZstdDecompressor().decompress(record.content, max_output_size=record.size)
+    else:
+        raw = zlib.decompress(record.content)
+    return raw.decode('utf-8')
+
+def attach_full_description(job, text):
+    """Store the full description compressed alongside a new Job."""
+    if not text:
+        return job
+    codec, data, size = compress_description(text)
+    job.full_description = JobDescription(codec=codec, content=data, size=size)
+    return job
+
+def full_description_text(job):
+    """Return a job's full description, falling back to its summary."""
+    record = job.full_description
+    return decompress_description(record) if record else job.description
+
+def store_full_descriptions(texts_by_fingerprint):
+    """Store descriptions for rows inserted in bulk, matched by fingerprint."""
+    if not texts_by_fingerprint:
+        return
+    rows = db.session.execute(
+        select(Job.id, Job.fingerprint).where(Job.fingerprint.in_(list(texts_by_fingerprint)))
+    ).all()
+    
+    records = []
+    for job_id, fingerprint in rows:
+        text = texts_by_fingerprint.get(fingerprint)
+        if text:
+            codec, data, size = compress_description(text)
+            records.append({'job_id': job_id, 'codec': codec, 'content': data, 'size': size})
+    
+    if records:
+        db.session.execute(insert(JobDescription), records)
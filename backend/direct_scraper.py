@@ -6,6 +6,8 @@ import os
 from datetime import datetime
 import sys
 import re
+from sources import REQUEST_HEADERS
+from sources.actuarylist import BASE_URL
 
 # Configure logging
 logging.basicConfig(
@@ -28,18 +30,11 @@ def analyze_website():
     logging.info("Starting website analysis")
     
     # URLs to check
-    urls = [
-        "https://www.actuarylist.com/",
-        "https://www.actuarylist.com/jobs",
-        "https://www.actuarylist.com/job-listings",
-        "https://www.actuarylist.com/actuarial-jobs",
-        "https://www.actuarylist.com/search"
-    ]
+    paths = ["/", "/jobs", "/job-listings", "/actuarial-jobs", "/search"]
+    urls = [f"{BASE_URL}{path}" for path in paths]
     
     # Use a realistic user agent
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-    }
+    headers = REQUEST_HEADERS
     
     for url in urls:
         try:
@@ -0,0 +1,147 @@
+import csv
+import io
+import json
+import logging
+from models import db, Job
+from queries import jobs_statement
+
+# Rows fetched from the server-side cursor per round trip
+EXPORT_BATCH_SIZE = 1000
+
+EXPORT_COLUMNS = (
+    Job.id,
+    Job.title,
+    Job.company,
+    Job.location,
+    Job.description,
+    Job.url,
+    Job.date_posted,
+)
+
+EXPORT_FIELDS = [column.key for column in EXPORT_COLUMNS]
+
+EXPORT_MIMETYPES = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+    'parquet': 'application/vnd.apache.parquet',
+}
+
+def iter_row_batches(args, batch_size=EXPORT_BATCH_SIZE, conditions=()):
+    """Yield lists of job rows matching the GET /jobs filters.
+    
+    Plain column rows are selected instead of ORM entities so nothing is
+    kept in the session identity map, and yield_per streams them from a
+    server-side cursor so only one batch is held in memory at a time.
+    """
+    stmt = jobs_statement(args, *EXPORT_COLUMNS, conditions=conditions).execution_options(yield_per=batch_size)
+    result = db.session.execute(stmt)
+    try:
+        for batch in result.partitions():
+            yield batch
+    finally:
+        result.close()
+
+def _format_date(value):
+    return value.strftime('%Y-%m-%d') if value else None
+
+def export_ndjson(batches):
+    """Serialize row batches as newline-delimited JSON."""
+    for batch in batches:
+        lines = []
+        for row in batch:
+            record = row._asdict()
+            record['date_posted'] = _format_date(record['date_posted'])
+            lines.append(json.dumps(record))
+        yield '\n'.join(lines) + '\n'
+
+def export_csv(batches):
+    """Serialize row batches as CSV with a header row."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_FIELDS)
+    
+    for batch in batches:
+        for row in batch:
+            writer.writerow(row[:-1] + (_format_date(row.date_posted),))
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate(0)
+    
+    # Header only when nothing matched
+    if buffer.tell():
+        yield buffer.getvalue()
+
+class _ChunkSink:
+    """Write-only file object that hands written bytes back to the caller."""
+    
+    def __init__(self):
+        self.chunks = []
+        self.closed = False
+        self.position = 0
+    
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+    
+    def tell(self):
+        return self.position
+    
+    def flush(self):
+        pass
+    
+    def close(self):
+        self.closed = True
+    
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+def export_parquet(batches):
+    """Serialize row batches as Parquet, one row group per batch."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    
+    schema = pa.schema([
+        ('id', pa.int64()),
+        ('title', pa.string()),
+        ('company', pa.string()),
+        ('location', pa.string()),
+        ('description', pa.string()),
+        ('url', pa.string()),
+        ('date_posted', pa.timestamp('us')),
+    ])
+    
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema)
+    try:
+        for batch in batches:
+            columns = list(zip(*batch))
+            table = pa.Table.from_arrays(
+                [pa.array(column, type=field.type) for column, field in zip(columns, schema)],
+                schema=schema
+            )
+            writer.write_table(table)
+            data = sink.drain()
+            if data:
+                yield data
+    finally:
+        writer.close()
+    
+    yield sink.drain()
+
+EXPORTERS = {
+    'ndjson': export_ndjson,
+    'csv': export_csv,
+    'parquet': export_parquet,
+}
+
+def parquet_available():
+    """Check whether the optional pyarrow dependency is installed."""
+    try:
+        import pyarrow.parquet  # noqa: F401
+        return True
+    except ImportError:
+        logging.warning("Parquet export requested but pyarrow is not installed")
+        return False
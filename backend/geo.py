@@ -0,0 +1,451 @@
+import csv
+import logging
+import math
+import os
+import re
+import threading
+import time
+import unicodedata
+from collections import defaultdict
+from sqlalchemy import false, select, update
+from models import db, Job
+from signals import jobs_changed
+
+# Offline gazetteer bundled with the backend: one row per place with its
+# region (state/province code, may be empty), ISO country code, coordinates
+# and '|'-separated aliases. For ambiguous names the first row wins unless
+# the location text names a matching region or country.
+GAZETTEER_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'gazetteer.csv')
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+# Grid cell size of the radius index, in degrees
+GRID_CELL_DEGREES = 1.0
+
+DEFAULT_RADIUS_KM = 50.0
+MAX_RADIUS_KM = 20000.0
+
+# Words naming a country, mapped to its ISO code
+COUNTRY_NAMES = {
+    'GB': ('uk', 'united kingdom', 'great britain', 'britain', 'england', 'scotland', 'wales', 'northern ireland'),
+    'IE': ('ireland',),
+    'US': ('us', 'usa', 'united states', 'united states of america', 'america'),
+    'CA': ('canada',),
+    'MX': ('mexico',),
+    'BR': ('brazil',),
+    'AR': ('argentina',),
+    'CL': ('chile',),
+    'CO': ('colombia',),
+    'PE': ('peru',),
+    'BM': ('bermuda',),
+    'FR': ('france',),
+    'ES': ('spain',),
+    'PT': ('portugal',),
+    'DE': ('germany', 'deutschland'),
+    'CH': ('switzerland',),
+    'NL': ('netherlands', 'the netherlands', 'holland'),
+    'BE': ('belgium',),
+    'LU': ('luxembourg',),
+    'IT': ('italy',),
+    'AT': ('austria',),
+    'CZ': ('czechia', 'czech republic'),
+    'PL': ('poland',),
+    'SK': ('slovakia',),
+    'HU': ('hungary',),
+    'RO': ('romania',),
+    'BG': ('bulgaria',),
+    'RS': ('serbia',),
+    'HR': ('croatia',),
+    'SI': ('slovenia',),
+    'GR': ('greece',),
+    'TR': ('turkey', 'turkiye'),
+    'CY': ('cyprus',),
+    'MT': ('malta',),
+    'GI': ('gibraltar',),
+    'SE': ('sweden',),
+    'DK': ('denmark',),
+    'NO': ('norway',),
+    'FI': ('finland',),
+    'IS': ('iceland',),
+    'EE': ('estonia',),
+    'LV': ('latvia',),
+    'LT': ('lithuania',),
+    'IN': ('india',),
+    'SG': ('singapore',),
+    'HK': ('hong kong',),
+    'JP': ('japan',),
+    'CN': ('china',),
+    'KR': ('south korea', 'korea'),
+    'TW': ('taiwan',),
+    'MY': ('malaysia',),
+    'TH': ('thailand',),
+    'ID': ('indonesia',),
+    'PH': ('philippines',),
+    'VN': ('vietnam',),
+    'AE': ('uae', 'united arab emirates'),
+    'SA': ('saudi arabia',),
+    'QA': ('qatar',),
+    'IL': ('israel',),
+    'PK': ('pakistan',),
+    'LK': ('sri lanka',),
+    'BD': ('bangladesh',),
+    'AU': ('australia',),
+    'NZ': ('new zealand',),
+    'ZA': ('south africa',),
+    'KE': ('kenya',),
+    'NG': ('nigeria',),
+    'GH': ('ghana',),
+    'EG': ('egypt',),
+    'MA': ('morocco',),
+    'MU': ('mauritius',),
+}
+
+# Region names used as qualifiers, mapped to the codes in the gazetteer
+REGION_NAMES = {
+    'alabama': 'AL', 'alaska': 'AK', 'arizona': 'AZ', 'arkansas': 'AR', 'california': 'CA',
+    'colorado': 'CO', 'connecticut': 'CT', 'delaware': 'DE', 'district of columbia': 'DC',
+    'florida': 'FL', 'georgia': 'GA', 'hawaii': 'HI', 'idaho': 'ID', 'illinois': 'IL',
+    'indiana': 'IN', 'iowa': 'IA', 'kansas': 'KS', 'kentucky': 'KY', 'louisiana': 'LA',
+    'maine': 'ME', 'maryland': 'MD', 'massachusetts': 'MA', 'michigan': 'MI', 'minnesota': 'MN',
+    'mississippi': 'MS', 'missouri': 'MO', 'montana': 'MT', 'nebraska': 'NE', 'nevada': 'NV',
+    'new hampshire': 'NH', 'new jersey': 'NJ', 'new mexico': 'NM', 'new york state': 'NY',
+    'north carolina': 'NC', 'north dakota': 'ND', 'ohio': 'OH', 'oklahoma': 'OK', 'oregon': 'OR',
+    'pennsylvania': 'PA', 'rhode island': 'RI', 'south carolina': 'SC', 'south dakota': 'SD',
+    'tennessee': 'TN', 'texas': 'TX', 'utah': 'UT', 'vermont': 'VT', 'virginia': 'VA',
+    'washington state': 'WA', 'west virginia': 'WV', 'wisconsin': 'WI', 'wyoming': 'WY',
+    'ontario': 'ON', 'quebec province': 'QC', 'british columbia': 'BC', 'alberta': 'AB',
+    'manitoba': 'MB', 'saskatchewan': 'SK', 'nova scotia': 'NS', 'new brunswick': 'NB',
+    'new south wales': 'NSW', 'victoria': 'VIC', 'queensland': 'QLD', 'western australia': 'WA',
+    'south australia': 'SA', 'australian capital territory': 'ACT',
+}
+
+_COUNTRY_CODES = {name: code for code, names in COUNTRY_NAMES.items() for name in names}
+
+# Separators between alternative places in one location string
+_PLACE_SEPARATORS = re.compile(r'\s*(?:/|;|\||\bor\b|&)\s*')
+_NON_WORD = re.compile(r'[^\w\s]')
+_WHITESPACE = re.compile(r'\s+')
+
+def normalize_place(value):
+    """Lowercase, strip accents and punctuation for gazetteer lookups."""
+    value = unicodedata.normalize('NFKD', value)
+    value = ''.join(char for char in value if not unicodedata.combining(char))
+    value = _NON_WORD.sub(' ', value.lower())
+    return _WHITESPACE.sub(' ', value).strip()
+
+class Place:
+    __slots__ = ('name', 'region', 'country', 'latitude', 'longitude')
+    
+    def __init__(self, name, region, country, latitude, longitude):
+        self.name = name
+        self.region = region
+        self.country = country
+        self.latitude = latitude
+        self.longitude = longitude
+    
+    def matches(self, qualifiers):
+        return self.region in qualifiers or self.country in qualifiers
+
+class Gazetteer:
+    """Resolves free-text locations ("Chicago, IL", "Boston MA / Remote")
+    to places from the bundled CSV."""
+    
+    def __init__(self, path=GAZETTEER_PATH):
+        self.places = defaultdict(list)
+        # Every region and country code some place is in
+        self.codes = set()
+        with open(path, encoding='utf-8', newline='') as f:
+            for row in csv.DictReader(f):
+                place = Place(
+                    row['name'], row['region'], row['country'],
+                    float(row['latitude']), float(row['longitude'])
+                )
+                self.codes.update(code for code in (place.region, place.country) if code)
+                names = [row['name']] + [alias for alias in row['aliases'].split('|') if alias]
+                for name in names:
+                    self.places[normalize_place(name)].append(place)
+    
+    def qualifier_codes(self, text):
+        """Region and country codes named by a piece of location text."""
+        key = normalize_place(text)
+        codes = set()
+        if key in _COUNTRY_CODES:
+            codes.add(_COUNTRY_CODES[key])
+        if key in REGION_NAMES:
+            codes.add(REGION_NAMES[key])
+        if 2 <= len(key) <= 3 and key.isalpha():
+            codes.add(key.upper())
+        # Unknown words ("Hybrid", "Ltd") must not rule places out
+        return codes & self.codes
+    
+    def _pick(self, candidates, qualifiers):
+        if not qualifiers:
+            return candidates[0]
+        for place in candidates:
+            if place.matches(qualifiers):
+                return place
+        # The text names a region or country none of the candidates are in
+        return None
+    
+    def _resolve_part(self, part, qualifiers):
+        key = normalize_place(part)
+        if key in self.places:
+            return self._pick(self.places[key], qualifiers)
+        
+        # "Saint Paul MN": trailing region code without a comma
+        name, _, suffix = key.rpartition(' ')
+        if name in self.places and suffix.upper() in self.codes:
+            return self._pick(self.places[name], qualifiers | {suffix.upper()})
+        return None
+    
+    def locate_all(self, location):
+        """Return every distinct place named in a location string."""
+        if not location:
+            return []
+        
+        segments = [segment for segment in _PLACE_SEPARATORS.split(location) if segment.strip()]
+        parts_by_segment = [[part for part in segment.split(',') if part.strip()] for segment in segments]
+        
+        # Qualifiers in any segment apply to all, as in "Boston MA / Chicago IL, USA"
+        shared = set()
+        for parts in parts_by_segment:
+            for part in parts[1:]:
+                if normalize_place(part) not in self.places:
+                    shared |= self.qualifier_codes(part)
+        
+        places = []
+        for parts in parts_by_segment:
+            for part in parts:
+                place = self._resolve_part(part, shared)
+                if place is not None:
+                    if place not in places:
+                        places.append(place)
+                    break
+        return places
+    
+    def locate(self, location):
+        """Return (latitude, longitude) of the first place named, or None."""
+        places = self.locate_all(location)
+        if not places:
+            return None
+        return places[0].latitude, places[0].longitude
+
+_gazetteer = None
+_gazetteer_lock = threading.Lock()
+
+def gazetteer():
+    """Return the process-wide gazetteer, loading it on first use."""
+    global _gazetteer
+    if _gazetteer is None:
+        with _gazetteer_lock:
+            if _gazetteer is None:
+                _gazetteer = Gazetteer()
+    return _gazetteer
+
+def locate_job(job):
+    """Set a Job's coordinates from its location text."""
+    point = gazetteer().locate(job.location)
+    job.latitude, job.longitude = point if point else (None, None)
+    return point
+
+def backfill_coordinates():
+    """Geocode rows stored before coordinates existed.
+    
+    Rows are updated per distinct location string; ones the gazetteer
+    cannot place stay NULL and are retried on the next run.
+    """
+    locations = db.session.scalars(
+        select(Job.location).where(Job.latitude.is_(None), Job.location.isnot(None)).distinct()
+    ).all()
+    places = gazetteer()
+    updated = 0
+    for location in locations:
+        point = places.locate(location)
+        if point is None:
+            continue
+        result = db.session.execute(
+            update(Job)
+            .where(Job.location == location, Job.latitude.is_(None))
+            .values(latitude=point[0], longitude=point[1])
+        )
+        updated += result.rowcount
+    db.session.commit()
+    return updated
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = (math.sin((lat2 - lat1) / 2) ** 2
+         + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+def parse_near(value):
+    """Resolve a near= value ("51.5,-0.12" or a place name) to coordinates.
+    
+    Raises ValueError when it is neither.
+    """
+    value = (value or '').strip()
+    if not value:
+        raise ValueError("near= must be 'lat,lon' or a place name")
+    
+    latitude, _, longitude = value.partition(',')
+    try:
+        point = (float(latitude), float(longitude))
+    except ValueError:
+        point = gazetteer().locate(value)
+        if point is None:
+            raise ValueError(f"Unknown place: {value}")
+        return point
+    
+    if not (-90 <= point[0] <= 90 and -180 <= point[1] <= 180):
+        raise ValueError("near= coordinates are out of range")
+    return point
+
+def parse_radius(value):
+    """Parse radius_km=, defaulting to DEFAULT_RADIUS_KM."""
+    if value in (None, ''):
+        return DEFAULT_RADIUS_KM
+    try:
+        radius = float(value)
+    except ValueError:
+        raise ValueError("radius_km must be a number")
+    if not 0 < radius <= MAX_RADIUS_KM:
+        raise ValueError(f"radius_km must be between 0 and {MAX_RADIUS_KM:g}")
+    return radius
+
+class GeoIndex:
+    """Grid of geocoded location strings for radius queries.
+    
+    Listings share a handful of distinct location strings, so the grid
+    holds one entry per (location, place) pair in GRID_CELL_DEGREES cells.
+    A radius query scans only the cells overlapping the circle's bounding
+    box and returns the matching location strings, which GET /jobs turns
+    into an indexed `location IN (...)` filter.
+    """
+    
+    def __init__(self, app, max_age=300):
+        self.app = app
+        self.max_age = max_age
+        self.cells = None
+        self.locations = set()
+        self.built_at = 0
+        self.lock = threading.Lock()
+        # Held while rebuilding, so concurrent requests share one rebuild
+        self.build_lock = threading.Lock()
+    
+    @staticmethod
+    def _cell(latitude, longitude):
+        return (math.floor(latitude / GRID_CELL_DEGREES), math.floor(longitude / GRID_CELL_DEGREES))
+    
+    def _add_locations(self, cells, locations, values):
+        places = gazetteer()
+        for location in values:
+            if not location or location in locations:
+                continue
+            locations.add(location)
+            for place in places.locate_all(location):
+                cells[self._cell(place.latitude, place.longitude)].append(
+                    (location, place.latitude, place.longitude)
+                )
+    
+    def rebuild(self):
+        start = time.perf_counter()
+        with self.app.app_context():
+            values = db.session.scalars(
+                select(Job.location).where(Job.location.isnot(None), Job.is_active.isnot(False)).distinct()
+            ).all()
+        
+        cells = defaultdict(list)
+        locations = set()
+        self._add_locations(cells, locations, values)
+        with self.lock:
+            self.cells = cells
+            self.locations = locations
+            self.built_at = time.monotonic()
+        logging.info(
+            f"Built geo index over {len(locations)} locations in "
+            f"{(time.perf_counter() - start) * 1000:.1f} ms"
+        )
+        return cells
+    
+    def _is_stale(self):
+        return self.cells is None or time.monotonic() - self.built_at > self.max_age
+    
+    def _current_cells(self):
+        cells = self.cells
+        if cells is None or self._is_stale():
+            with self.build_lock:
+                # Another request may have rebuilt it while this one waited
+                cells = self.cells
+                if cells is None or self._is_stale():
+                    cells = self.rebuild()
+        return cells
+    
+    def within(self, latitude, longitude, radius_km):
+        """Return {location: distance in km} for locations inside the circle."""
+        cells = self._current_cells()
+        
+        lat_span = radius_km / KM_PER_DEGREE
+        cos_lat = math.cos(math.radians(latitude))
+        lon_span = 180.0 if cos_lat < 1e-6 else min(180.0, lat_span / cos_lat)
+        
+        low = self._cell(max(-90.0, latitude - lat_span), longitude - lon_span)
+        high = self._cell(min(90.0, latitude + lat_span), longitude + lon_span)
+        columns = int(360 / GRID_CELL_DEGREES)
+        if high[1] - low[1] >= columns:
+            lon_cells = range(columns)
+        else:
+            lon_cells = range(low[1], high[1] + 1)
+        
+        matches = {}
+        for row in range(low[0], high[0] + 1):
+            for column in lon_cells:
+                # Wrap around the antimeridian
+                wrapped = (column + columns // 2) % columns - columns // 2
+                for location, lat, lon in cells.get((row, wrapped), ()):
+                    distance = haversine_km(latitude, longitude, lat, lon)
+                    if distance <= radius_km and distance < matches.get(location, math.inf):
+                        matches[location] = distance
+        return matches
+    
+    def _on_jobs_changed(self, app, reason, added=None, removed=None, **kwargs):
+        if self.cells is None:
+            return
+        if added is None and removed is None:
+            # Unknown change; rebuild on next use
+            self.cells = None
+            return
+        # Locations of removed jobs may still be used by others; extra
+        # strings only cost a filter value that matches nothing
+        new = {job.get('location') for job in added or []} - self.locations
+        if new:
+            with self.lock:
+                cells = defaultdict(list, {key: list(value) for key, value in self.cells.items()})
+                locations = set(self.locations)
+                self._add_locations(cells, locations, new)
+                self.cells = cells
+                self.locations = locations
+
+def radius_condition(args, app):
+    """Return the WHERE clause for GET /jobs?near=...&radius_km=..., or None.
+    
+    Raises ValueError for an unknown place or an invalid radius.
+    """
+    if 'near' not in args and 'radius_km' not in args:
+        return None
+    if 'near' not in args:
+        raise ValueError("radius_km requires near=")
+    latitude, longitude = parse_near(args.get('near'))
+    radius_km = parse_radius(args.get('radius_km'))
+    
+    locations = app.extensions['geo_index'].within(latitude, longitude, radius_km)
+    if not locations:
+        return false()
+    return Job.location.in_(sorted(locations))
+
+def init_geo_index(app):
+    """Create the app's radius-search index and keep it updated on ingest."""
+    index = GeoIndex(app, max_age=app.config.get('GEO_INDEX_MAX_AGE', 300))
+    app.extensions['geo_index'] = index
+    jobs_changed.connect(index._on_jobs_changed, sender=app, weak=False)
+    return index
@@ -0,0 +1,326 @@
+import json
+import logging
+import time
+from datetime import datetime
+from sqlalchemy import and_, delete, func, insert, literal, select, update
+from models import db, Job, JobDescription, JobStaging, ScrapeRun
+from signals import notify_jobs_changed
+from descriptions import compress_description, summarize_description
+from bulk_import import insert_rows
+from retention import missed_since, scrape_cutoff
+from geo import gazetteer
+from sources import DEFAULT_SOURCE, get_source
+# extract_json_data is re-exported for scraper.py
+from sources.actuarylist import BASE_URL, extract_json_data, normalize_job
+from dedup import (
+    content_fingerprint,
+    duplicate_index,
+    link_inserted_rows,
+    minhash_signature,
+    pack_signature,
+    reset_duplicate_index,
+)
+
+# Shared ingestion steps for scraper.py, json_scraper.py and pipeline.py:
+# extract listings from a page and normalize them into Job fields with the
+# page's source adapter (see sources/), clean (summarize, fingerprint and
+# compress) them, bulk load each scrape into a staging table and merge it
+# into jobs in one transaction.
+
+def clean_job(job):
+    """Summarize, fingerprint and compress a normalized job.
+    
+    Pure CPU work with picklable input and output, so it can run in a
+    process pool.
+    """
+    description_html = job["description_html"]
+    job["description"] = summarize_description(description_html) if description_html else "No description available"
+    
+    # Fingerprints cover the full description, as in dedup.fingerprint_job
+    text = description_html or job["description"]
+    job["fingerprint"] = content_fingerprint(job["title"], job["company"], job["location"], text)
+    job["minhash"] = pack_signature(minhash_signature(job["title"], text))
+    
+    point = gazetteer().locate(job["location"])
+    job["latitude"], job["longitude"] = point if point else (None, None)
+    
+    # Compressed here so the writer only copies bytes
+    if description_html:
+        job["description_codec"], job["description_content"], job["description_size"] = compress_description(description_html)
+    del job["description_html"]
+    return job
+
+def parse_page(html_content, source=None):
+    """Extract, normalize and clean every listing on one page of a source.
+    
+    Returns the cleaned jobs and the time spent in each step, as
+    {"extract": (wall, cpu), "clean": (wall, cpu)}.
+    """
+    source = source or get_source(DEFAULT_SOURCE)
+    timings = {}
+    
+    wall, cpu = time.perf_counter(), time.process_time()
+    listings = source.extract(html_content)
+    jobs = []
+    for listing in listings:
+        try:
+            job = source.normalize(listing)
+            if job:
+                job["source"] = source.name
+                jobs.append(job)
+        except Exception as e:
+            logging.error(f"Error normalizing {source.name} job: {str(e)}")
+    timings["extract"] = (time.perf_counter() - wall, time.process_time() - cpu)
+    
+    wall, cpu = time.perf_counter(), time.process_time()
+    cleaned = []
+    for job in jobs:
+        try:
+            cleaned.append(clean_job(job))
+        except Exception as e:
+            logging.error(f"Error cleaning job {job.get('title')}: {str(e)}")
+    timings["clean"] = (time.perf_counter() - wall, time.process_time() - cpu)
+    
+    return cleaned, timings
+
+# Columns written to the staging table for each cleaned job
+STAGING_FIELDS = (
+    'scrape_run', 'source', 'title', 'company', 'location', 'description', 'url', 'tags', 'fingerprint', 'minhash',
+    'is_active', 'created_at', 'latitude', 'longitude',
+    'description_codec', 'description_content', 'description_size',
+)
+
+def start_scrape_run(app, source=DEFAULT_SOURCE):
+    """Record the start of a scrape of one source and return its run id."""
+    with app.app_context():
+        run = ScrapeRun(source=source)
+        db.session.add(run)
+        db.session.commit()
+        return run.id
+
+def stage_jobs(jobs, app, scrape_run):
+    """Bulk load cleaned jobs into the staging table for a scrape run."""
+    if not jobs:
+        return 0
+    rows = [{field: job.get(field) for field in STAGING_FIELDS} for job in jobs]
+    for row in rows:
+        row["scrape_run"] = scrape_run
+    
+    with app.app_context():
+        insert_rows(rows, JobStaging, STAGING_FIELDS)
+        db.session.commit()
+    return len(rows)
+
+def discard_staged_jobs(app, scrape_run, jobs_seen=0):
+    """Drop a failed or partial scrape's staged jobs, leaving jobs untouched."""
+    with app.app_context():
+        db.session.execute(delete(JobStaging).where(JobStaging.scrape_run == scrape_run))
+        run = db.session.get(ScrapeRun, scrape_run)
+        run.finished_at = datetime.utcnow()
+        run.jobs_seen = jobs_seen
+        run.complete = False
+        db.session.commit()
+    logging.warning(f"Discarded staged jobs of incomplete scrape run {scrape_run}")
+
+def merge_staged_jobs(app, scrape_run):
+    """Merge a complete scrape run's staged jobs into jobs in one transaction.
+    
+    Listings seen again are stamped with this run, new ones are inserted
+    with their descriptions, and listings missing from the last
+    SCRAPE_EXPIRE_AFTER complete runs are marked inactive, which hides
+    them from GET /jobs until retention deletes them. Readers see the
+    previous dataset until the commit and the new one after it. A run
+    that staged nothing is discarded instead.
+    
+    Returns counts of staged, added and expired jobs.
+    """
+    now = datetime.utcnow()
+    in_run = JobStaging.scrape_run == scrape_run
+    staged_fingerprints = select(JobStaging.fingerprint).where(in_run)
+    # One staged row per fingerprint, in case a listing appeared twice
+    first_staged = select(func.min(JobStaging.id)).where(in_run).group_by(JobStaging.fingerprint)
+    
+    with app.app_context():
+        try:
+            # Loaded before the insert so the new rows are clustered below
+            index = duplicate_index(app)
+            
+            staged = db.session.scalar(select(func.count()).select_from(JobStaging).where(in_run))
+            if not staged:
+                # A run that parsed nothing saw a blocked or changed page, not
+                # an empty board; it must not expire the source's listings
+                db.session.rollback()
+                discard_staged_jobs(app, scrape_run)
+                return {"staged": 0, "added": 0, "expired": 0}
+            run = db.session.get(ScrapeRun, scrape_run)
+            run.finished_at = now
+            run.jobs_seen = staged
+            run.complete = True
+            db.session.flush()
+            
+            # Listings whose visibility changes, captured for the change signal
+            reactivated = db.session.execute(
+                select(Job).where(
+                    Job.is_active == db.false(),
+                    Job.fingerprint.in_(staged_fingerprints.where(JobStaging.is_active == db.true()))
+                )
+            ).scalars().all()
+            deactivated = db.session.execute(
+                select(Job).where(
+                    Job.is_active.isnot(False),
+                    Job.fingerprint.in_(staged_fingerprints.where(JobStaging.is_active == db.false()))
+                )
+            ).scalars().all()
+            added = [job.to_dict() for job in reactivated]
+            removed = [job.to_dict() for job in deactivated]
+            
+            # Stamp listings seen in this run, taking their state from the source
+            for is_active in (True, False):
+                db.session.execute(
+                    update(Job)
+                    .where(Job.fingerprint.in_(staged_fingerprints.where(JobStaging.is_active == is_active)))
+                    .values(is_active=is_active, last_seen_at=now, last_seen_scrape=scrape_run)
+                    .execution_options(synchronize_session=False)
+                )
+            
+            # Expire this source's listings missing from its last K complete runs
+            cutoff = scrape_cutoff(app.config.get('SCRAPE_EXPIRE_AFTER', 1), run.source)
+            expired = []
+            if cutoff is not None:
+                stale = and_(Job.is_active.isnot(False), Job.source == run.source, missed_since(cutoff))
+                expired = db.session.execute(select(Job).where(stale)).scalars().all()
+                removed += [job.to_dict() for job in expired]
+                db.session.execute(
+                    update(Job).where(stale).values(is_active=False)
+                    .execution_options(synchronize_session=False)
+                )
+            
+            # Insert listings whose fingerprint is not stored yet
+            max_id = db.session.scalar(select(func.max(Job.id))) or 0
+            jobs = Job.__table__
+            db.session.execute(
+                insert(jobs).from_select(
+                    ['source', 'title', 'company', 'location', 'description', 'url', 'tags', 'fingerprint', 'minhash',
+                     'is_active', 'created_at', 'latitude', 'longitude',
+                     'date_posted', 'last_seen_at', 'last_seen_scrape'],
+                    select(
+                        JobStaging.source, JobStaging.title, JobStaging.company, JobStaging.location, JobStaging.description,
+                        JobStaging.url, JobStaging.tags, JobStaging.fingerprint, JobStaging.minhash,
+                        JobStaging.is_active, JobStaging.created_at,
+                        JobStaging.latitude, JobStaging.longitude,
+                        literal(now, db.DateTime), literal(now, db.DateTime), literal(scrape_run, db.Integer)
+                    ).where(
+                        JobStaging.id.in_(first_staged),
+                        ~select(jobs.c.id).where(jobs.c.fingerprint == JobStaging.fingerprint).exists()
+                    )
+                )
+            )
+            inserted = (Job.id > max_id) & (Job.last_seen_scrape == scrape_run)
+            
+            db.session.execute(
+                insert(JobDescription.__table__).from_select(
+                    ['job_id', 'codec', 'content', 'size'],
+                    select(
+                        Job.id, JobStaging.description_codec,
+                        JobStaging.description_content, JobStaging.description_size
+                    )
+                    .join(JobStaging, JobStaging.fingerprint == Job.fingerprint)
+                    .where(inserted, JobStaging.id.in_(first_staged), JobStaging.description_content.isnot(None))
+                )
+            )
+            
+            new_fingerprints = db.session.scalars(select(Job.fingerprint).where(inserted)).all()
+            link_inserted_rows(new_fingerprints, index)
+            added += [
+                job.to_dict() for job in db.session.execute(
+                    select(Job).where(inserted, Job.is_active.isnot(False)).order_by(Job.id)
+                ).scalars()
+            ]
+            
+            db.session.execute(delete(JobStaging).where(in_run))
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            logging.error(f"Error merging scrape run {scrape_run}: {str(e)}")
+            discard_staged_jobs(app, scrape_run)
+            raise
+    
+    logging.info(
+        f"Merged scrape run {scrape_run}: {staged} staged, {len(new_fingerprints)} added, "
+        f"{len(expired)} expired"
+    )
+    if added or removed:
+        notify_jobs_changed(app, 'scrape', added=added, removed=removed)
+    return {"staged": staged, "added": len(new_fingerprints), "expired": len(expired)}
+
+def ingest_jobs(jobs, app, source=DEFAULT_SOURCE):
+    """Stage and merge already cleaned jobs as one scrape run of a source."""
+    scrape_run = start_scrape_run(app, source)
+    try:
+        stage_jobs(jobs, app, scrape_run)
+    except Exception:
+        discard_staged_jobs(app, scrape_run, len(jobs))
+        raise
+    return merge_staged_jobs(app, scrape_run)
+
+def process_job_data(job_data, app):
+    """Process job data and add to database."""
+    if not job_data:
+        logging.error("No job data to process")
+        return 0
+    
+    logging.info(f"Processing {len(job_data)} jobs")
+    
+    # First, let's examine the structure of the first job
+    logging.info(f"First job structure: {json.dumps(job_data[0], indent=2)[:1000]}...")
+    
+    cleaned = []
+    for job in job_data:
+        try:
+            normalized = normalize_job(job)
+            if normalized:
+                normalized["source"] = DEFAULT_SOURCE
+                cleaned.append(clean_job(normalized))
+                logging.info(f"Extracted job: {normalized['title']} at {normalized['company']} in {normalized['location']}")
+        except Exception as e:
+            logging.error(f"Error processing job: {str(e)}")
+    
+    if not cleaned:
+        return 0
+    return ingest_jobs(cleaned, app)["added"]
+
+def backfill_sources():
+    """Tag rows stored before sources existed with the actuarylist source.
+    
+    Jobs are tagged when a scrape stamped them or their URL points at the
+    site; ones added through the API stay untagged.
+    """
+    updated = db.session.execute(
+        update(Job)
+        .where(Job.source.is_(None), (Job.last_seen_scrape.isnot(None)) | Job.url.startswith(f"{BASE_URL}/"))
+        .values(source=DEFAULT_SOURCE)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    db.session.execute(
+        update(ScrapeRun).where(ScrapeRun.source.is_(None)).values(source=DEFAULT_SOURCE)
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+    return updated
+
+def clear_all_jobs(app):
+    """Clear all jobs from the database."""
+    with app.app_context():
+        try:
+            job_count = Job.query.count()
+            logging.info(f"Clearing {job_count} jobs from database")
+            JobDescription.query.delete()
+            Job.query.delete()
+            db.session.commit()
+            reset_duplicate_index(app)
+            notify_jobs_changed(app, 'clear')
+            logging.info("All jobs cleared from database")
+            return True
+        except Exception as e:
+            logging.error(f"Error clearing jobs: {str(e)}")
+            return False
@@ -0,0 +1,78 @@
+import logging
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import inspect, text
+from models import db
+from dedup import backfill_fingerprints
+from geo import backfill_coordinates
+from ingest import backfill_sources
+
+def add_missing_columns(engine, table):
+    """Add columns declared on the model but missing from an existing table.
+    
+    Only nullable or defaulted columns can be added this way; anything
+    else needs a manual migration.
+    """
+    existing = {column['name'] for column in inspect(engine).get_columns(table.name)}
+    added = []
+    
+    with engine.begin() as connection:
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            column_type = column.type.compile(dialect=engine.dialect)
+            connection.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'))
+            added.append(column.name)
+    
+    return added
+
+def add_missing_indexes(engine, table):
+    """Create indexes declared on the model but missing from the database."""
+    existing = {index['name'] for index in inspect(engine).get_indexes(table.name)}
+    added = []
+    
+    for index in table.indexes:
+        if index.name not in existing:
+            index.create(bind=engine)
+            added.append(index.name)
+    
+    return added
+
+def init_db():
+    """Create missing tables, columns and indexes on the primary database."""
+    engine = db.engine
+    existing_tables = set(inspect(engine).get_table_names())
+    
+    # New tables come with their columns and indexes
+    db.create_all(bind_key=None)
+    
+    for table in db.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            logging.info(f"Created table {table.name}")
+            continue
+        for column in add_missing_columns(engine, table):
+            logging.info(f"Added column {table.name}.{column}")
+        for index in add_missing_indexes(engine, table):
+            logging.info(f"Created index {index}")
+
+@click.command('init-db')
+@with_appcontext
+def init_db_command():
+    """Create or upgrade the database schema."""
+    init_db()
+    click.echo("Database schema is up to date.")
+    
+    # Rows stored before fingerprints existed
+    fingerprinted = backfill_fingerprints()
+    if fingerprinted:
+        click.echo(f"Fingerprinted {fingerprinted} existing jobs.")
+    
+    # Rows stored before coordinates existed
+    located = backfill_coordinates()
+    if located:
+        click.echo(f"Geocoded {located} existing jobs.")
+    
+    # Rows stored before sources existed
+    tagged = backfill_sources()
+    if tagged:
+        click.echo(f"Tagged {tagged} existing jobs with their source.")
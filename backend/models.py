@@ -1,10 +1,20 @@
 from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime
+from db_routing import RoutingSession
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 
 class Job(db.Model):
     __tablename__ = 'jobs'
+    __table_args__ = (
+        db.Index('ix_jobs_fingerprint', 'fingerprint', unique=True),
+        db.Index('ix_jobs_duplicate_of', 'duplicate_of'),
+        # Drive retention's batched deletes (see retention.py)
+        db.Index('ix_jobs_last_seen_scrape', 'last_seen_scrape'),
+        db.Index('ix_jobs_active_last_seen', 'is_active', 'last_seen_at'),
+        # Radius search filters on the location strings matched by geo.GeoIndex
+        db.Index('ix_jobs_location', 'location'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(200), nullable=False)
@@ -13,6 +23,146 @@ class Job(db.Model):
     description = db.Column(db.Text)
     url = db.Column(db.String(500))
     date_posted = db.Column(db.DateTime, default=datetime.utcnow)
+    # Source adapter the listing was scraped from (see sources/); NULL for
+    # jobs added through the API
+    source = db.Column(db.String(50))
+    # Comma-separated topic tags from the source, e.g. "Pricing, Python"
+    tags = db.Column(db.String(500))
+    
+    # Hash of the normalized title/company/location/description, unique per posting
+    fingerprint = db.Column(db.String(64))
+    # Packed MinHash signature used for near-duplicate detection; deferred so
+    # list queries do not load it
+    minhash = db.deferred(db.Column(db.LargeBinary))
+    # Root job of the near-duplicate cluster this job belongs to, if any
+    duplicate_of = db.Column(db.Integer)
+    
+    # Listing state reported by the source: whether it is still open and
+    # when it was first published there. NULL is_active counts as active.
+    is_active = db.Column(db.Boolean, default=True)
+    created_at = db.Column(db.DateTime)
+    # When, and in which scrape run, the listing was last seen
+    last_seen_at = db.Column(db.DateTime, default=datetime.utcnow)
+    last_seen_scrape = db.Column(db.Integer)
+    
+    # Coordinates of the first place named in `location`, from the bundled
+    # gazetteer (see geo.py); NULL when it names no known place
+    latitude = db.Column(db.Float)
+    longitude = db.Column(db.Float)
+    
+    # Full original description, stored compressed in a side table and only
+    # loaded by detail views; `description` above holds a short summary
+    full_description = db.relationship(
+        'JobDescription',
+        uselist=False,
+        lazy='select',
+        cascade='all, delete-orphan'
+    )
+    
+    def to_dict(self):
+        """Return the JSON representation used by the API."""
+        return {
+            'id': self.id,
+            'title': self.title,
+            'company': self.company,
+            'location': self.location,
+            'description': self.description,
+            'url': self.url,
+            'source': self.source,
+            'tags': [tag.strip() for tag in self.tags.split(',')] if self.tags else [],
+            'date_posted': self.date_posted.strftime('%Y-%m-%d') if self.date_posted else None,
+            'latitude': self.latitude,
+            'longitude': self.longitude,
+            'duplicate_of': self.duplicate_of
+        }
     
     def __repr__(self):
         return f'<Job {self.title} at {self.company}>'
+
+class JobDescription(db.Model):
+    __tablename__ = 'job_descriptions'
+    
+    job_id = db.Column(db.Integer, db.ForeignKey('jobs.id', ondelete='CASCADE'), primary_key=True)
+    codec = db.Column(db.String(10), nullable=False)
+    content = db.Column(db.LargeBinary, nullable=False)
+    # Uncompressed size in bytes
+    size = db.Column(db.Integer, nullable=False)
+    
+    def __repr__(self):
+        return f'<JobDescription {self.job_id} ({self.codec}, {self.size} bytes)>'
+
+# Cleaned listings of one scrape run, bulk loaded here and then merged into
+# jobs in a single transaction (see ingest.merge_staged_jobs)
+class JobStaging(db.Model):
+    __tablename__ = 'jobs_staging'
+    __table_args__ = (
+        db.Index('ix_jobs_staging_scrape_run_fingerprint', 'scrape_run', 'fingerprint'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    scrape_run = db.Column(db.Integer, nullable=False)
+    source = db.Column(db.String(50))
+    title = db.Column(db.String(200), nullable=False)
+    company = db.Column(db.String(100), nullable=False)
+    location = db.Column(db.String(100))
+    description = db.Column(db.Text)
+    url = db.Column(db.String(500))
+    tags = db.Column(db.String(500))
+    fingerprint = db.Column(db.String(64), nullable=False)
+    minhash = db.Column(db.LargeBinary)
+    is_active = db.Column(db.Boolean)
+    created_at = db.Column(db.DateTime)
+    latitude = db.Column(db.Float)
+    longitude = db.Column(db.Float)
+    # Full description, already compressed as in JobDescription
+    description_codec = db.Column(db.String(10))
+    description_content = db.Column(db.LargeBinary)
+    description_size = db.Column(db.Integer)
+    
+    def __repr__(self):
+        return f'<JobStaging {self.title} (run {self.scrape_run})>'
+
+class ScrapeRun(db.Model):
+    __tablename__ = 'scrape_runs'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    # Each run crawls one source; expiry compares a source's runs only
+    source = db.Column(db.String(50))
+    started_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime)
+    jobs_seen = db.Column(db.Integer, nullable=False, default=0)
+    # Every page was fetched and parsed; only complete runs count towards
+    # the "not seen in the last K scrapes" retention rule
+    complete = db.Column(db.Boolean, nullable=False, default=False)
+    
+    def __repr__(self):
+        return f'<ScrapeRun {self.id} of {self.source} ({self.jobs_seen} jobs)>'
+
+# Leader lease of the scheduler (see scheduler.py); PostgreSQL uses an
+# advisory lock instead, other databases renew this row
+class SchedulerLease(db.Model):
+    __tablename__ = 'scheduler_leases'
+    
+    name = db.Column(db.String(50), primary_key=True)
+    holder = db.Column(db.String(200), nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False)
+    heartbeat_at = db.Column(db.DateTime, nullable=False)
+    
+    def __repr__(self):
+        return f'<SchedulerLease {self.name} held by {self.holder}>'
+
+# Latest schedule slot claimed by each scheduled task, so every slot runs
+# once however many workers are scheduling
+class ScheduledTask(db.Model):
+    __tablename__ = 'scheduled_tasks'
+    
+    name = db.Column(db.String(50), primary_key=True)
+    # UTC time the claimed slot was due
+    due_at = db.Column(db.DateTime)
+    holder = db.Column(db.String(200))
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    error = db.Column(db.Text)
+    
+    def __repr__(self):
+        return f'<ScheduledTask {self.name} due {self.due_at}>'
@@ -0,0 +1,344 @@
+import logging
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+from ingest import discard_staged_jobs, merge_staged_jobs, parse_page, stage_jobs, start_scrape_run
+from sources import DEFAULT_SOURCE, enabled_sources, get_source
+
+# Marks the end of a stage's input
+_DONE = object()
+
+_process_pool = None
+_process_pool_lock = threading.Lock()
+
+# Sources are scraped concurrently but merged one at a time, so two runs
+# inserting the same new listing never race on its fingerprint
+_merge_lock = threading.Lock()
+
+def shared_process_pool(workers=None):
+    """Return the process pool reused across pipeline runs.
+    
+    Workers are spawned rather than forked because the web process runs
+    threads (scheduler, request handlers) that a fork would copy mid-flight.
+    """
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is None:
+            _process_pool = ProcessPoolExecutor(
+                max_workers=workers or os.cpu_count(),
+                mp_context=multiprocessing.get_context('spawn')
+            )
+        return _process_pool
+
+def replace_broken_pool(pool, workers=None):
+    """Drop a pool whose workers died and return a fresh shared one."""
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is pool:
+            _process_pool = None
+            logging.warning("Process pool broke, starting a new one")
+    pool.shutdown(wait=False, cancel_futures=True)
+    return shared_process_pool(workers)
+
+class RateLimiter:
+    """Space calls at least 1/rate seconds apart across threads; rate 0 is unlimited."""
+    
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate else 0.0
+        self._next = 0.0
+        self._lock = threading.Lock()
+    
+    def wait(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            at = max(now, self._next)
+            self._next = at + self.interval
+        if at > now:
+            time.sleep(at - now)
+
+class StageTimer:
+    """Items processed plus wall and CPU seconds spent in one stage."""
+    
+    def __init__(self, name):
+        self.name = name
+        self.items = 0
+        self.errors = 0
+        self.wall = 0.0
+        self.cpu = 0.0
+        self._lock = threading.Lock()
+    
+    def add(self, items=0, wall=0.0, cpu=0.0, errors=0):
+        with self._lock:
+            self.items += items
+            self.wall += wall
+            self.cpu += cpu
+            self.errors += errors
+    
+    @contextmanager
+    def measure(self, items=1):
+        wall, cpu = time.perf_counter(), time.thread_time()
+        try:
+            yield
+        except Exception:
+            self.add(errors=1, wall=time.perf_counter() - wall, cpu=time.thread_time() - cpu)
+            raise
+        self.add(items=items, wall=time.perf_counter() - wall, cpu=time.thread_time() - cpu)
+    
+    def as_dict(self):
+        return {
+            "items": self.items,
+            "errors": self.errors,
+            "wall_seconds": round(self.wall, 4),
+            "cpu_seconds": round(self.cpu, 4),
+        }
+
+class IngestionPipeline:
+    """Fetch -> parse -> persist for one source, with stages joined by bounded queues.
+    
+    Fetching runs on the source's concurrency in threads, spaced by its
+    rate limit, and the CPU-bound parse stage
+    (extraction, HTML cleaning, fingerprinting, compression) on a process
+    pool, one page per task. A single writer thread bulk loads cleaned
+    jobs into the staging table in batches; once every page is in, the
+    run is merged into jobs in one transaction, or discarded if any page
+    failed so a partial crawl never replaces the current listings. Every queue is bounded and at most twice the parse workers'
+    pages are in flight, so a slow stage blocks the ones before it and
+    memory stays bounded however many pages are crawled.
+    """
+    
+    def __init__(self, app, source=None, fetch=None, fetch_workers=None, parse_workers=None,
+                 queue_size=8, batch_size=200, use_processes=True):
+        self.app = app
+        self.source = source or get_source(DEFAULT_SOURCE)
+        self.fetch = fetch or self.source.fetch
+        self.rate_limiter = RateLimiter(self.source.rate_limit)
+        self.fetch_workers = fetch_workers or self.source.concurrency
+        self.parse_workers = parse_workers or os.cpu_count()
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.use_processes = use_processes
+        self.stages = {name: StageTimer(name) for name in ('fetch', 'extract', 'clean', 'stage', 'merge')}
+        self.scrape_run = None
+        self.empty_pages = 0
+    
+    def _fetcher(self, urls, pages):
+        while True:
+            url = urls.get()
+            if url is _DONE:
+                return
+            self.rate_limiter.wait()
+            try:
+                with self.stages['fetch'].measure():
+                    html = self.fetch(url)
+            except Exception as e:
+                logging.error(f"Error fetching {url}: {str(e)}")
+                continue
+            pages.put(html)
+    
+    def _parser(self, pages, jobs, executor):
+        in_flight = deque()
+        max_in_flight = self.parse_workers * 2
+        
+        def submit(html, retry=True):
+            nonlocal executor
+            try:
+                future = executor.submit(parse_page, html, self.source)
+            except BrokenProcessPool:
+                executor = replace_broken_pool(executor, self.parse_workers)
+                future = executor.submit(parse_page, html, self.source)
+            in_flight.append((future, html, retry))
+        
+        def forward_oldest():
+            future, html, retry = in_flight.popleft()
+            try:
+                cleaned, timings = future.result()
+            except BrokenProcessPool as e:
+                # Pages lost with a dead worker are parsed once more on a new pool
+                error = e
+                if retry:
+                    try:
+                        submit(html, retry=False)
+                        return
+                    except Exception as e:
+                        error = e
+                logging.error(f"Error parsing page: {str(error)}")
+                self.stages['extract'].add(errors=1)
+                return
+            except Exception as e:
+                logging.error(f"Error parsing page: {str(e)}")
+                self.stages['extract'].add(errors=1)
+                return
+            self.stages['extract'].add(1, *timings['extract'])
+            self.stages['clean'].add(len(cleaned), *timings['clean'])
+            if not cleaned:
+                # A challenge page or changed markup parses as no listings
+                logging.warning("Listing page yielded no jobs")
+                self.empty_pages += 1
+            for job in cleaned:
+                jobs.put(job)
+        
+        try:
+            while True:
+                html = pages.get()
+                if html is _DONE:
+                    break
+                try:
+                    submit(html)
+                except Exception as e:
+                    # e.g. a pool that cannot be restarted; keep draining so fetchers never block
+                    logging.error(f"Error submitting page: {str(e)}")
+                    self.stages['extract'].add(errors=1)
+                    continue
+                if len(in_flight) >= max_in_flight:
+                    forward_oldest()
+            
+            while in_flight:
+                forward_oldest()
+        finally:
+            jobs.put(_DONE)
+    
+    def _stager(self, jobs):
+        batch = []
+        
+        def flush():
+            # Keep draining on failure so upstream stages never block
+            try:
+                with self.stages['stage'].measure(len(batch)):
+                    stage_jobs(batch, self.app, self.scrape_run)
+            except Exception as e:
+                logging.error(f"Error staging {len(batch)} jobs: {str(e)}")
+            batch.clear()
+        
+        while True:
+            job = jobs.get()
+            if job is _DONE:
+                break
+            batch.append(job)
+            if len(batch) >= self.batch_size:
+                flush()
+        if batch:
+            flush()
+    
+    def run(self, urls=None, documents=()):
+        """Ingest listing pages from URLs and/or already fetched HTML.
+        
+        Without URLs, crawls the source's listing URLs, skipping the first
+        pages when their HTML is passed in documents, so the run still
+        covers the whole source. Returns a report with totals, throughput
+        and per-stage timings.
+        """
+        documents = list(documents)
+        if urls is None:
+            urls = self.source.listing_urls()[len(documents):]
+        start = time.perf_counter()
+        self.scrape_run = start_scrape_run(self.app, self.source.name)
+        url_queue = queue.Queue(self.queue_size)
+        page_queue = queue.Queue(self.queue_size)
+        job_queue = queue.Queue(self.queue_size * self.batch_size)
+        
+        if self.use_processes:
+            executor = shared_process_pool(self.parse_workers)
+        else:
+            executor = ThreadPoolExecutor(max_workers=self.parse_workers)
+        
+        fetchers = [
+            threading.Thread(target=self._fetcher, args=(url_queue, page_queue), daemon=True)
+            for _ in range(self.fetch_workers)
+        ]
+        parser = threading.Thread(target=self._parser, args=(page_queue, job_queue, executor), daemon=True)
+        stager = threading.Thread(target=self._stager, args=(job_queue,), daemon=True)
+        for thread in fetchers + [parser, stager]:
+            thread.start()
+        
+        # Pre-fetched pages skip the fetch stage
+        for html in documents:
+            page_queue.put(html)
+        for url in urls:
+            url_queue.put(url)
+        for _ in fetchers:
+            url_queue.put(_DONE)
+        for thread in fetchers:
+            thread.join()
+        
+        page_queue.put(_DONE)
+        parser.join()
+        stager.join()
+        
+        if not self.use_processes:
+            executor.shutdown()
+        
+        # Only a run that read every page and found listings on each may
+        # replace (and expire) the source's listings
+        failed = sum(self.stages[name].errors for name in ('fetch', 'extract', 'stage'))
+        complete = (
+            failed == 0 and self.stages['extract'].items > 0
+            and self.stages['clean'].items > 0 and self.empty_pages == 0
+        )
+        merged = {"added": 0, "expired": 0}
+        error = None
+        if complete:
+            try:
+                with _merge_lock, self.stages['merge'].measure(self.stages['stage'].items):
+                    merged = merge_staged_jobs(self.app, self.scrape_run)
+            except Exception as e:
+                logging.error(f"Error merging scrape run {self.scrape_run}: {str(e)}")
+                complete = False
+                error = str(e)
+                discard_staged_jobs(self.app, self.scrape_run, self.stages['clean'].items)
+        else:
+            discard_staged_jobs(self.app, self.scrape_run, self.stages['clean'].items)
+        
+        elapsed = time.perf_counter() - start
+        report = {
+            "source": self.source.name,
+            "scrape_run": self.scrape_run,
+            "complete": complete,
+            "pages": self.stages['extract'].items,
+            "empty_pages": self.empty_pages,
+            "jobs_parsed": self.stages['clean'].items,
+            "jobs_added": merged["added"],
+            "jobs_expired": merged["expired"],
+            "elapsed_seconds": round(elapsed, 4),
+            "jobs_per_second": round(self.stages['clean'].items / elapsed, 2) if elapsed else 0.0,
+            "stages": {name: stage.as_dict() for name, stage in self.stages.items()},
+        }
+        if error:
+            report["error"] = error
+        logging.info(f"Ingestion pipeline finished: {report}")
+        return report
+
+def run_pipeline(app, urls=None, documents=(), **options):
+    """Run one ingestion pass and return its report."""
+    return IngestionPipeline(app, **options).run(urls=urls, documents=documents)
+
+def run_sources(app, sources=None, documents=None, **options):
+    """Scrape several sources at once, each in its own pipeline and scrape run.
+    
+    Sources default to SCRAPE_SOURCES. documents maps a source name to
+    pages already fetched for it, which replace its first pages. A source that
+    fails is reported as incomplete and its run discarded without
+    affecting the others. Returns {source name: report}.
+    """
+    sources = enabled_sources() if sources is None else sources
+    documents = documents or {}
+    
+    def run_source(source):
+        try:
+            return run_pipeline(app, source=source, documents=documents.get(source.name, ()), **options)
+        except Exception as e:
+            logging.error(f"Error scraping {source.name}: {str(e)}")
+            return {"source": source.name, "complete": False, "jobs_added": 0, "error": str(e)}
+    
+    if not sources:
+        return {}
+    with ThreadPoolExecutor(max_workers=len(sources), thread_name_prefix='source') as executor:
+        reports = list(executor.map(run_source, sources))
+    return {report["source"]: report for report in reports}
@@ -0,0 +1,356 @@
+import hmac
+import itertools
+import json
+import logging
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+from functools import wraps
+from flask import current_app, g, jsonify, request
+
+# On-demand sampling profiler for API requests and scrape runs. An operator
+# arms it through POST /debug/profiles (with the PROFILING_TOKEN), either
+# for a fraction of requests or for the next N scrapes. While a profile is
+# open one sampler thread reads sys._current_frames() every
+# PROFILE_INTERVAL_MS and counts the stacks of the profiled threads (all
+# threads during a scrape, whose fetchers run on their own threads).
+#
+# Finished profiles are written to PROFILE_DIR as collapsed stacks
+# ("frame;frame;frame count" lines, the input of flamegraph.pl and
+# speedscope) next to a JSON file with wall and CPU time per stage. The
+# settings live in the same directory, so every worker on a node follows
+# one toggle. When disarmed a request only reads the cached settings, which
+# are checked against the file once a second.
+
+# Paths of the profiler's own endpoints, never profiled
+DEBUG_PATH = '/debug/profiles'
+
+# How often cached settings are compared with the file, in seconds
+SETTINGS_CHECK_INTERVAL = 1.0
+
+_PROFILE_ID = re.compile(r'^[0-9A-Za-z_-]+$')
+_local = threading.local()
+
+def profiling_config_from_env():
+    """Read profiler settings from the environment."""
+    return {
+        # Operator token for /debug/profiles; unset disables the endpoints
+        'PROFILING_TOKEN': os.getenv('PROFILING_TOKEN') or None,
+        'PROFILE_DIR': os.getenv('PROFILE_DIR', 'profiles'),
+        'PROFILE_INTERVAL_MS': float(os.getenv('PROFILE_INTERVAL_MS', '10')),
+        'PROFILE_KEEP': int(os.getenv('PROFILE_KEEP', '100')),
+    }
+
+class Profile:
+    """Samples, stage timings and totals of one profiled request or scrape."""
+    
+    def __init__(self, profile_id, kind, name, threads=None):
+        self.id = profile_id
+        self.kind = kind
+        self.name = name
+        # Thread idents to sample; None samples every thread
+        self.threads = threads
+        self.stacks = Counter()
+        self.samples = 0
+        self.stages = {}
+        self.status = None
+        self.started_at = datetime.utcnow()
+        self.wall = time.perf_counter()
+        self.cpu = time.thread_time() if threads else time.process_time()
+    
+    def sample(self, frames, names, skip):
+        idents = frames if self.threads is None else self.threads
+        for ident in idents:
+            frame = frames.get(ident)
+            if frame is None or ident == skip:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})')
+                frame = frame.f_back
+            if self.threads is None:
+                stack.append(f'thread {names.get(ident, ident)}')
+            self.stacks[';'.join(reversed(stack))] += 1
+        self.samples += 1
+    
+    def add_stage(self, name, wall, cpu, **counts):
+        stage = self.stages.setdefault(name, {'calls': 0, 'wall_seconds': 0.0, 'cpu_seconds': 0.0})
+        stage['calls'] += 1
+        stage['wall_seconds'] += wall
+        stage['cpu_seconds'] += cpu
+        stage.update(counts)
+    
+    def finish(self):
+        self.wall = time.perf_counter() - self.wall
+        self.cpu = (time.thread_time() if self.threads else time.process_time()) - self.cpu
+    
+    def metadata(self, interval):
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'name': self.name,
+            'started_at': self.started_at.isoformat(timespec='seconds'),
+            'status': self.status,
+            'wall_seconds': round(self.wall, 6),
+            'cpu_seconds': round(self.cpu, 6),
+            'samples': self.samples,
+            'interval_ms': interval * 1000,
+            'stages': {
+                name: {key: round(value, 6) if isinstance(value, float) else value for key, value in stage.items()}
+                for name, stage in self.stages.items()
+            },
+        }
+    
+    def collapsed(self):
+        return ''.join(f'{stack} {count}\n' for stack, count in self.stacks.most_common())
+
+class Profiler:
+    """Arming state, the sampler thread and the store of finished profiles."""
+    
+    def __init__(self, directory, interval=0.01, keep=100):
+        self.directory = directory
+        self.interval = interval
+        self.keep = keep
+        self.lock = threading.Lock()
+        self.active = []
+        self.wakeup = threading.Event()
+        self.thread = None
+        self.ids = itertools.count(1)
+        self.settings = {'sample_rate': 0.0, 'scrapes': 0, 'expires_at': None}
+        self.settings_mtime = None
+        self.checked_at = float('-inf')
+    
+    # Settings
+    
+    @property
+    def settings_path(self):
+        return os.path.join(self.directory, 'settings.json')
+    
+    def _load_settings(self):
+        try:
+            mtime = os.stat(self.settings_path).st_mtime_ns
+        except FileNotFoundError:
+            mtime = None
+        if mtime != self.settings_mtime:
+            settings = {'sample_rate': 0.0, 'scrapes': 0, 'expires_at': None}
+            if mtime is not None:
+                try:
+                    with open(self.settings_path, encoding='utf-8') as f:
+                        settings.update(json.load(f))
+                except (OSError, ValueError) as e:
+                    logging.error(f"Error reading profiler settings: {str(e)}")
+            self.settings, self.settings_mtime = settings, mtime
+        self.checked_at = time.monotonic()
+        return self.settings
+    
+    def current_settings(self):
+        """Return the armed settings, re-read from disk at most once a second."""
+        settings = self.settings
+        if time.monotonic() - self.checked_at > SETTINGS_CHECK_INTERVAL:
+            settings = self._load_settings()
+        if settings['expires_at'] is not None and settings['expires_at'] < time.time():
+            return {'sample_rate': 0.0, 'scrapes': 0, 'expires_at': None}
+        return settings
+    
+    def configure(self, sample_rate=None, scrapes=None, duration=None):
+        """Arm or disarm profiling for every worker sharing the directory."""
+        with self.lock:
+            settings = dict(self._load_settings())
+            if sample_rate is not None:
+                settings['sample_rate'] = sample_rate
+            if scrapes is not None:
+                settings['scrapes'] = scrapes
+            if settings['sample_rate'] or settings['scrapes']:
+                settings['expires_at'] = time.time() + duration if duration else None
+            else:
+                settings['expires_at'] = None
+            self._save_settings(settings)
+            return settings
+    
+    def _save_settings(self, settings):
+        os.makedirs(self.directory, exist_ok=True)
+        temporary = f'{self.settings_path}.{os.getpid()}.tmp'
+        with open(temporary, 'w', encoding='utf-8') as f:
+            json.dump(settings, f)
+        os.replace(temporary, self.settings_path)
+        self._load_settings()
+    
+    def should_sample_request(self):
+        rate = self.current_settings()['sample_rate']
+        return rate > 0 and random.random() < rate
+    
+    def claim_scrape(self):
+        """Use up one armed scrape profile, if any."""
+        with self.lock:
+            settings = self._load_settings()
+            if not self.current_settings()['scrapes']:
+                return False
+            self._save_settings(dict(settings, scrapes=settings['scrapes'] - 1))
+            return True
+    
+    # Sampling
+    
+    def start(self, kind, name, threads=None):
+        profile_id = f"{datetime.utcnow():%Y%m%dT%H%M%S%f}-{kind}-{os.getpid()}-{next(self.ids)}"
+        profile = Profile(profile_id, kind, name, threads)
+        with self.lock:
+            self.active.append(profile)
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, name='profiler', daemon=True)
+                self.thread.start()
+            self.wakeup.set()
+        return profile
+    
+    def finish(self, profile):
+        with self.lock:
+            self.active.remove(profile)
+            if not self.active:
+                self.wakeup.clear()
+        profile.finish()
+        try:
+            self._write(profile)
+        except OSError as e:
+            logging.error(f"Error writing profile {profile.id}: {str(e)}")
+    
+    def _run(self):
+        me = threading.get_ident()
+        while True:
+            self.wakeup.wait()
+            with self.lock:
+                profiles = list(self.active)
+            if profiles:
+                frames = sys._current_frames()
+                names = {}
+                if any(profile.threads is None for profile in profiles):
+                    names = {thread.ident: thread.name for thread in threading.enumerate()}
+                for profile in profiles:
+                    profile.sample(frames, names, me)
+                del frames
+            time.sleep(self.interval)
+    
+    # Store
+    
+    def _write(self, profile):
+        os.makedirs(self.directory, exist_ok=True)
+        base = os.path.join(self.directory, profile.id)
+        with open(f'{base}.collapsed', 'w', encoding='utf-8') as f:
+            f.write(profile.collapsed())
+        with open(f'{base}.json', 'w', encoding='utf-8') as f:
+            json.dump(profile.metadata(self.interval), f, indent=2)
+        logging.info(f"Wrote {profile.kind} profile {profile.id} ({profile.samples} samples)")
+        
+        # Keep only the newest profiles
+        for profile_id in self.profile_ids()[self.keep:]:
+            for extension in ('.json', '.collapsed'):
+                try:
+                    os.remove(os.path.join(self.directory, profile_id + extension))
+                except FileNotFoundError:
+                    pass
+    
+    def profile_ids(self):
+        """Ids of the stored profiles, newest first."""
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return []
+        ids = [name[:-len('.json')] for name in names if name.endswith('.json') and name != 'settings.json']
+        return sorted(ids, reverse=True)
+    
+    def path(self, profile_id, extension):
+        """Path of a stored profile file, or None for ids that are not ours."""
+        if not _PROFILE_ID.match(profile_id):
+            return None
+        path = os.path.join(self.directory, profile_id + extension)
+        return path if os.path.exists(path) else None
+
+@contextmanager
+def stage(name):
+    """Time a block into the current thread's profile; free when not profiling."""
+    profile = getattr(_local, 'profile', None)
+    if profile is None:
+        yield
+        return
+    wall, cpu = time.perf_counter(), time.thread_time()
+    try:
+        yield
+    finally:
+        profile.add_stage(name, time.perf_counter() - wall, time.thread_time() - cpu)
+
+def record_stages(stages, prefix=''):
+    """Copy a pipeline report's stage timings into the current profile."""
+    profile = getattr(_local, 'profile', None)
+    if profile is None:
+        return
+    for name, timings in stages.items():
+        profile.add_stage(
+            prefix + name, timings['wall_seconds'], timings['cpu_seconds'],
+            items=timings['items'], errors=timings['errors']
+        )
+
+@contextmanager
+def profile_scrape(app):
+    """Profile every thread during a scrape when one is armed."""
+    profiler = app.extensions.get('profiler')
+    if profiler is None or not profiler.claim_scrape():
+        yield None
+        return
+    profile = profiler.start('scrape', 'scrape_jobs')
+    _local.profile = profile
+    try:
+        yield profile
+    finally:
+        _local.profile = None
+        profiler.finish(profile)
+
+def _start_request_profile():
+    profiler = current_app.extensions['profiler']
+    if request.path.startswith(DEBUG_PATH) or not profiler.should_sample_request():
+        return
+    name = f"{request.method} {request.full_path.rstrip('?')}"
+    g.profile = profiler.start('request', name, threads=[threading.get_ident()])
+    _local.profile = g.profile
+
+def _record_status(response):
+    profile = g.get('profile')
+    if profile is not None:
+        profile.status = response.status_code
+    return response
+
+def _finish_request_profile(exc):
+    profile = g.pop('profile', None)
+    if profile is not None:
+        _local.profile = None
+        current_app.extensions['profiler'].finish(profile)
+
+def operator_only(view):
+    """Require the PROFILING_TOKEN in the X-Profiling-Token header."""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        token = current_app.config.get('PROFILING_TOKEN')
+        if not token:
+            return jsonify({"error": "Profiling is not enabled"}), 404
+        supplied = request.headers.get('X-Profiling-Token', '')
+        if not hmac.compare_digest(supplied.encode('utf-8'), token.encode('utf-8')):
+            return jsonify({"error": "Invalid profiling token"}), 403
+        return view(*args, **kwargs)
+    return wrapper
+
+def init_profiling(app):
+    """Create the app's profiler and hook request sampling into it."""
+    profiler = Profiler(
+        os.path.abspath(app.config.get('PROFILE_DIR', 'profiles')),
+        interval=app.config.get('PROFILE_INTERVAL_MS', 10) / 1000,
+        keep=app.config.get('PROFILE_KEEP', 100)
+    )
+    app.extensions['profiler'] = profiler
+    app.before_request(_start_request_profile)
+    app.after_request(_record_status)
+    app.teardown_request(_finish_request_profile)
+    return profiler
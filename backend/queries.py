@@ -0,0 +1,54 @@
+from sqlalchemy import select
+from models import Job
+
+# Columns GET /jobs can be sorted by; anything else falls back to newest first
+SORT_COLUMNS = {
+    'company': Job.company,
+    'title': Job.title,
+    'location': Job.location,
+}
+
+def is_truthy(value):
+    """Interpret a query string flag such as ?collapse_duplicates=true."""
+    return bool(value) and value.lower() in ('1', 'true', 'yes', 'on')
+
+def apply_job_filters(stmt, args):
+    """Apply the GET /jobs location/company/source/duplicate/inactive filters to a SELECT statement."""
+    location = args.get('location')
+    company = args.get('company')
+    
+    if location:
+        stmt = stmt.where(Job.location.ilike(f'%{location}%'))
+    if company:
+        stmt = stmt.where(Job.company.ilike(f'%{company}%'))
+    if args.get('source'):
+        stmt = stmt.where(Job.source == args.get('source'))
+    if is_truthy(args.get('collapse_duplicates')):
+        # Only the root of each near-duplicate cluster
+        stmt = stmt.where(Job.duplicate_of.is_(None))
+    if not is_truthy(args.get('include_inactive')):
+        # Listings expired by a scrape or closed at the source
+        stmt = stmt.where(Job.is_active.isnot(False))
+    
+    return stmt
+
+def apply_job_sorting(stmt, args):
+    """Apply the GET /jobs sort_by ordering to a SELECT statement."""
+    sort_by = args.get('sort_by', 'date')  # Default sort by date
+    
+    if sort_by in SORT_COLUMNS:
+        return stmt.order_by(SORT_COLUMNS[sort_by], Job.id)
+    return stmt.order_by(Job.date_posted.desc(), Job.id.desc())
+
+def jobs_statement(args, *columns, conditions=()):
+    """Build the filtered and sorted SELECT behind GET /jobs.
+    
+    Selects whole Job entities unless specific columns are given.
+    conditions are extra WHERE clauses resolved by the caller, such as
+    the radius filter from geo.radius_condition().
+    """
+    stmt = select(*columns) if columns else select(Job)
+    stmt = apply_job_filters(stmt, args)
+    if conditions:
+        stmt = stmt.where(*conditions)
+    return apply_job_sorting(stmt, args)
@@ -0,0 +1,190 @@
+import logging
+import sys
+import threading
+import time
+from array import array
+from sqlalchemy import select
+from models import db, Job
+from queries import SORT_COLUMNS, is_truthy
+from signals import dataset_version
+
+# Query parameters the snapshot can answer; anything else (including
+# include_inactive, as the snapshot only holds active listings) goes to the database
+SUPPORTED_PARAMS = {'location', 'company', 'sort_by', 'collapse_duplicates'}
+
+class JobSnapshot:
+    """Immutable, column-oriented copy of the jobs table.
+    
+    Each job is stored once as its pre-serialized JSON object. Filters run
+    over precomputed lowercase columns and each sort_by key has its own
+    presorted array of row positions, so a list request is a single pass
+    over an index array with no database round trip or ORM objects.
+    
+    Orders follow PostgreSQL's defaults: NULLs sort last ascending and
+    first for the descending date order. Text compares case-insensitively
+    with code point order as the tie-breaker, which approximates but does
+    not reproduce a locale collation (punctuation and accents may place
+    differently than en_US.UTF-8 would).
+    """
+    
+    __slots__ = ('built_at', 'size', 'json_rows', 'company_lower', 'location_lower', 'is_duplicate', 'orders')
+    
+    def __init__(self, jobs, dumps):
+        self.built_at = time.monotonic()
+        
+        ids = array('q')
+        json_rows = []
+        companies = []
+        locations = []
+        company_keys = []
+        location_keys = []
+        title_keys = []
+        dates = []
+        is_duplicate = bytearray()
+        lower_cache = {}
+        key_cache = {}
+        
+        def lowered(value):
+            # Interned so repeated companies/locations share one string
+            value = sys.intern(value or '')
+            if value not in lower_cache:
+                lower_cache[value] = sys.intern(value.lower())
+            return value, lower_cache[value]
+        
+        def text_key(value):
+            # NULLs last, then case-insensitive with a stable tie-breaker
+            if value is None:
+                return (True, '', '')
+            if value not in key_cache:
+                key_cache[value] = (False, value.casefold(), value)
+            return key_cache[value]
+        
+        for job in jobs:
+            ids.append(job.id)
+            json_rows.append(dumps(job.to_dict()))
+            companies.append(lowered(job.company))
+            locations.append(lowered(job.location))
+            company_keys.append(text_key(job.company))
+            location_keys.append(text_key(job.location))
+            title_keys.append(text_key(job.title))
+            # Missing dates come first in the descending date order
+            dates.append(job.date_posted.timestamp() if job.date_posted else float('inf'))
+            is_duplicate.append(1 if job.duplicate_of else 0)
+        
+        self.size = len(ids)
+        self.json_rows = tuple(json_rows)
+        self.company_lower = tuple(lower for _, lower in companies)
+        self.location_lower = tuple(lower for _, lower in locations)
+        self.is_duplicate = bytes(is_duplicate)
+        
+        # Same orderings as queries.apply_job_sorting, with id as tie-breaker
+        positions = range(self.size)
+        sort_keys = {
+            'company': lambda i: (company_keys[i], ids[i]),
+            'title': lambda i: (title_keys[i], ids[i]),
+            'location': lambda i: (location_keys[i], ids[i]),
+        }
+        self.orders = {key: array('l', sorted(positions, key=sort_keys[key])) for key in SORT_COLUMNS}
+        self.orders['date'] = array('l', sorted(positions, key=lambda i: (dates[i], ids[i]), reverse=True))
+    
+    def query(self, args):
+        """Return the GET /jobs response body for the given parameters."""
+        sort_by = args.get('sort_by', 'date')
+        order = self.orders.get(sort_by, self.orders['date'])
+        
+        location = (args.get('location') or '').lower()
+        company = (args.get('company') or '').lower()
+        collapse = is_truthy(args.get('collapse_duplicates'))
+        
+        company_lower = self.company_lower
+        location_lower = self.location_lower
+        is_duplicate = self.is_duplicate
+        json_rows = self.json_rows
+        
+        selected = [
+            json_rows[i] for i in order
+            if (not location or location in location_lower[i])
+            and (not company or company in company_lower[i])
+            and not (collapse and is_duplicate[i])
+        ]
+        return '[' + ','.join(selected) + ']'
+
+class ReadModel:
+    """Holds the current JobSnapshot and swaps in a new one after changes.
+    
+    A change only marks the snapshot stale; the next reader rebuilds it
+    while concurrent readers wait for that one rebuild instead of each
+    running their own.
+    """
+    
+    def __init__(self, app, max_age=60):
+        self.app = app
+        self.max_age = max_age
+        self.snapshot = None
+        # Dataset version (see signals.py) the current snapshot was built at
+        self.snapshot_version = None
+        self._rebuild_lock = threading.Lock()
+    
+    def rebuild(self):
+        """Build a fresh snapshot from the primary and swap it in atomically."""
+        with self._rebuild_lock:
+            return self._build()
+    
+    def _build(self):
+        # Taken before the query, so a change committed during the build
+        # leaves the new snapshot stale
+        version = dataset_version(self.app)
+        # A fresh app context gets its own session, so the caller's session
+        # is untouched and the build sees everything committed so far
+        with self.app.app_context():
+            start = time.perf_counter()
+            stmt = (
+                select(Job).where(Job.is_active.isnot(False))
+                .order_by(Job.id).execution_options(yield_per=1000)
+            )
+            snapshot = JobSnapshot(db.session.execute(stmt).scalars(), self.app.json.dumps)
+            
+            # Readers holding the old snapshot keep using it until they finish
+            self.snapshot, self.snapshot_version = snapshot, version
+            logging.info(
+                f"Rebuilt read model with {snapshot.size} jobs in "
+                f"{(time.perf_counter() - start) * 1000:.1f} ms"
+            )
+            return snapshot
+    
+    def _is_stale(self, snapshot):
+        return (
+            snapshot is None
+            or self.snapshot_version != dataset_version(self.app)
+            or time.monotonic() - snapshot.built_at > self.max_age
+        )
+    
+    def current(self):
+        """Return a snapshot, rebuilding it when stale or older than max_age.
+        
+        The age limit picks up writes made by other worker processes.
+        """
+        snapshot = self.snapshot
+        if self._is_stale(snapshot):
+            with self._rebuild_lock:
+                # Another reader may have rebuilt it while this one waited
+                snapshot = self.snapshot
+                if self._is_stale(snapshot):
+                    snapshot = self._build()
+        return snapshot
+    
+    def query(self, args):
+        """Answer a GET /jobs request in process, or return None if unsupported."""
+        if set(args) - SUPPORTED_PARAMS:
+            return None
+        return self.current().query(args)
+
+def init_read_model(app):
+    """Serve GET /jobs from an in-memory snapshot when READ_MODEL_ENABLED is set."""
+    if not app.config.get('READ_MODEL_ENABLED'):
+        return None
+    
+    # Changes bump the dataset version, which marks the snapshot stale
+    read_model = ReadModel(app, max_age=app.config.get('READ_MODEL_MAX_AGE', 60))
+    app.extensions['read_model'] = read_model
+    return read_model
@@ -0,0 +1,189 @@
+import logging
+import os
+import time
+from datetime import datetime, timedelta
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import and_, delete, func, or_, select, update
+from models import db, Job, JobDescription, JobStaging, ScrapeRun
+from dedup import release_duplicates
+from signals import notify_jobs_changed
+
+# Retention policy enforced by compact_jobs(), each rule disabled by 0:
+#   RETENTION_INACTIVE_DAYS   delete listings marked inactive and not seen for N days
+#   RETENTION_MISSED_SCRAPES  delete listings missing from the last K complete
+#                             scrapes of their source
+# Jobs added through the API are never stamped by a scrape, so only the
+# first rule applies to them.
+#
+# Rows are deleted in small batches, each selected through an index
+# (ix_jobs_active_last_seen, ix_jobs_last_seen_scrape) and committed in its
+# own short transaction, with a pause in between so writers are never
+# blocked for long.
+
+# Completed scrape runs kept for the missed-scrapes rule and debugging
+SCRAPE_RUNS_KEPT = 1000
+
+# Unfinished scrape runs older than this are treated as crashed
+STAGING_ABANDONED_HOURS = 24
+
+def retention_config_from_env():
+    """Read retention settings from the environment."""
+    return {
+        'RETENTION_INACTIVE_DAYS': float(os.getenv('RETENTION_INACTIVE_DAYS', '14')),
+        'RETENTION_MISSED_SCRAPES': int(os.getenv('RETENTION_MISSED_SCRAPES', '0')),
+        'RETENTION_BATCH_SIZE': int(os.getenv('RETENTION_BATCH_SIZE', '500')),
+        'RETENTION_BATCH_PAUSE': float(os.getenv('RETENTION_BATCH_PAUSE', '0.1')),
+        # Cron schedule of compaction runs (see scheduler.py); empty disables them
+        'RETENTION_SCHEDULE': os.getenv('RETENTION_SCHEDULE', '0 * * * *'),
+    }
+
+def scrape_cutoff(missed_scrapes, source):
+    """Return the id of a source's K-th most recent complete scrape, or None."""
+    if missed_scrapes <= 0:
+        return None
+    return db.session.scalar(
+        select(ScrapeRun.id)
+        .where(ScrapeRun.complete == db.true(), ScrapeRun.source == source)
+        .order_by(ScrapeRun.id.desc())
+        .offset(missed_scrapes - 1)
+        .limit(1)
+    )
+
+def missed_since(cutoff):
+    """Condition for jobs not stamped by scrape run cutoff or a later one.
+    
+    Rows stored before scrape runs were recorded were never stamped, so
+    they count as missed too.
+    """
+    return or_(Job.last_seen_scrape.is_(None), Job.last_seen_scrape < cutoff)
+
+def expiry_rules(config, now=None):
+    """Return {rule name: condition} for the enabled retention rules."""
+    now = now or datetime.utcnow()
+    rules = {}
+    
+    inactive_days = config['RETENTION_INACTIVE_DAYS']
+    if inactive_days > 0:
+        rules['inactive'] = and_(
+            Job.is_active == db.false(),
+            Job.last_seen_at < now - timedelta(days=inactive_days)
+        )
+    
+    # Each source is measured against its own scrapes
+    missed = []
+    sources = db.session.scalars(select(ScrapeRun.source).where(ScrapeRun.complete == db.true()).distinct()).all()
+    for source in sources:
+        cutoff = scrape_cutoff(config['RETENTION_MISSED_SCRAPES'], source)
+        if cutoff is not None:
+            missed.append(and_(Job.source == source, missed_since(cutoff)))
+    if missed:
+        rules['missed_scrapes'] = or_(*missed)
+    
+    return rules
+
+def delete_jobs_batch(condition, batch_size, app):
+    """Delete up to batch_size matching jobs in one transaction.
+    
+    Returns the number of deleted jobs and, as to_dict() dicts, those
+    that were still active; inactive ones are already hidden from readers.
+    """
+    jobs = db.session.execute(
+        select(Job).where(condition).order_by(Job.id).limit(batch_size)
+    ).scalars().all()
+    if not jobs:
+        return 0, []
+    
+    removed = [job.to_dict() for job in jobs if job.is_active is not False]
+    ids = [job.id for job in jobs]
+    
+    index = app.extensions.get('near_duplicates')
+    if index is not None:
+        with index.lock:
+            for job_id in ids:
+                index.remove(job_id)
+    
+    # Detach rows of this batch from their clusters first so none of them
+    # is promoted to root, then re-root clusters that lose their root
+    db.session.execute(update(Job).where(Job.id.in_(ids)).values(duplicate_of=None))
+    orphaned_roots = db.session.scalars(
+        select(Job.duplicate_of).where(Job.duplicate_of.in_(ids)).distinct()
+    ).all()
+    for root in orphaned_roots:
+        release_duplicates(root, app)
+    
+    db.session.execute(delete(JobDescription).where(JobDescription.job_id.in_(ids)))
+    db.session.execute(delete(Job).where(Job.id.in_(ids)))
+    db.session.commit()
+    return len(ids), removed
+
+def prune_scrape_runs(now=None):
+    """Keep only the most recent SCRAPE_RUNS_KEPT scrape runs.
+    
+    Also drops staged rows left behind by scrapes that died before
+    merging or discarding them.
+    """
+    now = now or datetime.utcnow()
+    abandoned = select(ScrapeRun.id).where(
+        ScrapeRun.finished_at.is_(None),
+        ScrapeRun.started_at < now - timedelta(hours=STAGING_ABANDONED_HOURS)
+    )
+    db.session.execute(delete(JobStaging).where(JobStaging.scrape_run.in_(abandoned)))
+    
+    newest = db.session.scalar(select(func.max(ScrapeRun.id)))
+    if newest is not None and newest > SCRAPE_RUNS_KEPT:
+        db.session.execute(delete(JobStaging).where(JobStaging.scrape_run <= newest - SCRAPE_RUNS_KEPT))
+        db.session.execute(delete(ScrapeRun).where(ScrapeRun.id <= newest - SCRAPE_RUNS_KEPT))
+    db.session.commit()
+
+def compact_jobs(app=None, max_batches=None):
+    """Delete jobs that fall outside the retention policy.
+    
+    Returns the number of deleted jobs per rule. max_batches bounds the
+    work done in one call; the next call picks up where it stopped.
+    """
+    app = app or current_app._get_current_object()
+    config = app.config
+    batch_size = config['RETENTION_BATCH_SIZE']
+    pause = config['RETENTION_BATCH_PAUSE']
+    deleted = {}
+    batches = 0
+    
+    for rule, condition in expiry_rules(config).items():
+        deleted[rule] = 0
+        while max_batches is None or batches < max_batches:
+            count, removed = delete_jobs_batch(condition, batch_size, app)
+            if not count:
+                break
+            batches += 1
+            deleted[rule] += count
+            notify_jobs_changed(app, 'expire', removed=removed)
+            if count < batch_size:
+                break
+            time.sleep(pause)
+    
+    prune_scrape_runs()
+    if any(deleted.values()):
+        logging.info(f"Retention compaction deleted {deleted}")
+    return deleted
+
+def scheduled_compaction(app):
+    """Run compaction from the scheduler thread."""
+    with app.app_context():
+        try:
+            compact_jobs(app)
+        except Exception as e:
+            db.session.rollback()
+            logging.error(f"Error during retention compaction: {str(e)}")
+
+@click.command('compact-jobs')
+@click.option('--max-batches', type=int, default=None, help='Stop after this many delete batches.')
+@with_appcontext
+def compact_jobs_command(max_batches):
+    """Delete listings that fall outside the retention policy."""
+    deleted = compact_jobs(max_batches=max_batches)
+    if not deleted:
+        click.echo("No retention rules are enabled.")
+    for rule, count in deleted.items():
+        click.echo(f"{rule}: deleted {count} jobs")
@@ -0,0 +1,434 @@
+import atexit
+import logging
+import os
+import socket
+import threading
+import uuid
+import zlib
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import or_, select, text, update
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from models import db, ScheduledTask, SchedulerLease
+
+# Cron-style schedules for background tasks, coordinated across workers
+# and nodes. One worker at a time holds the scheduler lease and fires due
+# tasks; before running, it claims the slot in scheduled_tasks with a
+# conditional UPDATE, so a slot runs at most once even when two workers
+# briefly both believe they lead (a stalled leader, a failover).
+#
+# Leadership is a session-level advisory lock on PostgreSQL, held on a
+# dedicated connection, and a row in scheduler_leases elsewhere. Either is
+# renewed by a heartbeat every SCHEDULER_LEASE_TTL / 3 seconds; when the
+# leader dies or loses the database another worker takes over within one
+# TTL. Table leases compare the workers' clocks, which must agree to well
+# within the TTL.
+
+LEASE_NAME = 'scheduler'
+
+# Advisory lock key shared by every worker scheduling against one database
+ADVISORY_LOCK_KEY = zlib.crc32(b'actuarylist-scheduler')
+
+# Slots are still fired this late (at least two TTLs), e.g. right after a
+# failover; older missed slots are skipped
+MISFIRE_GRACE_SECONDS = 120
+
+MONTH_NAMES = ('jan', 'feb', 'mar', 'apr', 'may', 'jun', 'jul', 'aug', 'sep', 'oct', 'nov', 'dec')
+WEEKDAY_NAMES = ('sun', 'mon', 'tue', 'wed', 'thu', 'fri', 'sat')
+
+# (name, lowest, highest, names) of the five cron fields
+CRON_FIELDS = (
+    ('minute', 0, 59, {}),
+    ('hour', 0, 23, {}),
+    ('day of month', 1, 31, {}),
+    ('month', 1, 12, {name: i for i, name in enumerate(MONTH_NAMES, 1)}),
+    ('day of week', 0, 7, {name: i for i, name in enumerate(WEEKDAY_NAMES)}),
+)
+
+CRON_MACROS = {
+    '@hourly': '0 * * * *',
+    '@daily': '0 0 * * *',
+    '@midnight': '0 0 * * *',
+    '@weekly': '0 0 * * 0',
+    '@monthly': '0 0 1 * *',
+    '@yearly': '0 0 1 1 *',
+    '@annually': '0 0 1 1 *',
+}
+
+def scheduler_config_from_env():
+    """Read scheduler settings from the environment."""
+    return {
+        'SCHEDULER_ENABLED': os.getenv('SCHEDULER_ENABLED', '').lower() in ('1', 'true', 'yes', 'on'),
+        'SCHEDULER_LEASE_TTL': float(os.getenv('SCHEDULER_LEASE_TTL', '30')),
+        'SCRAPE_SCHEDULE': os.getenv('SCRAPE_SCHEDULE', '*/3 * * * *; 0 0,3,6 * * *'),
+    }
+
+def _cron_value(value, names, field):
+    value = value.lower()
+    if value in names:
+        return names[value]
+    if not value.isdigit():
+        raise ValueError(f"Invalid {field} in cron expression: {value!r}")
+    return int(value)
+
+def _parse_cron_field(value, field, low, high, names):
+    values = set()
+    for item in value.split(','):
+        item_range, slash, step = item.partition('/')
+        if slash and (not step.isdigit() or int(step) == 0):
+            raise ValueError(f"Invalid {field} step in cron expression: {item!r}")
+        step = int(step) if slash else 1
+        
+        if item_range == '*':
+            start, end = low, high
+        else:
+            first, dash, last = item_range.partition('-')
+            start = _cron_value(first, names, field)
+            # "5/15" means every 15 from 5 to the end of the range
+            end = _cron_value(last, names, field) if dash else (high if slash else start)
+        if not low <= start <= end <= high:
+            raise ValueError(f"{field.capitalize()} out of range in cron expression: {item!r}")
+        values.update(range(start, end + 1, step))
+    return frozenset(values)
+
+class CronSchedule:
+    """A five-field cron expression ("*/3 * * * *", "0 6 * * mon-fri"),
+    evaluated in the server's local time."""
+    
+    def __init__(self, expression):
+        self.expression = expression.strip()
+        fields = CRON_MACROS.get(self.expression.lower(), self.expression).split()
+        if len(fields) != 5:
+            raise ValueError(f"Cron expression needs five fields: {expression!r}")
+        
+        minutes, hours, days, months, weekdays = (
+            _parse_cron_field(value, *spec) for value, spec in zip(fields, CRON_FIELDS)
+        )
+        self.minutes = minutes
+        self.hours = hours
+        self.days = days
+        self.months = months
+        # 0 and 7 are both Sunday
+        self.weekdays = frozenset(day % 7 for day in weekdays)
+        # As in cron, when both day fields are restricted either may match
+        self.any_day = fields[2].startswith('*') or fields[4].startswith('*')
+    
+    def matches(self, moment):
+        if (moment.minute not in self.minutes or moment.hour not in self.hours
+                or moment.month not in self.months):
+            return False
+        day = moment.day in self.days
+        weekday = (moment.weekday() + 1) % 7 in self.weekdays
+        return (day and weekday) if self.any_day else (day or weekday)
+    
+    def latest(self, now, window):
+        """Return the most recent matching minute in (now - window, now], or None."""
+        moment = now.replace(second=0, microsecond=0)
+        earliest = now - window
+        while moment > earliest:
+            if self.matches(moment):
+                return moment
+            moment -= timedelta(minutes=1)
+        return None
+    
+    def __repr__(self):
+        return f'<CronSchedule {self.expression}>'
+
+def parse_schedules(value):
+    """Parse ';'-separated cron expressions; an empty value disables the task."""
+    return [CronSchedule(expression) for expression in (value or '').split(';') if expression.strip()]
+
+class TableLease:
+    """Leader lease kept in a scheduler_leases row."""
+    
+    kind = 'table'
+    
+    def __init__(self, app, holder, ttl, name=LEASE_NAME):
+        self.app = app
+        self.holder = holder
+        self.ttl = ttl
+        self.name = name
+    
+    def acquire(self):
+        """Take over an expired lease or renew our own; return whether we hold it."""
+        now = datetime.utcnow()
+        values = {'holder': self.holder, 'expires_at': now + timedelta(seconds=self.ttl), 'heartbeat_at': now}
+        
+        with self.app.app_context():
+            try:
+                result = db.session.execute(
+                    update(SchedulerLease)
+                    .where(
+                        SchedulerLease.name == self.name,
+                        or_(SchedulerLease.holder == self.holder, SchedulerLease.expires_at < now)
+                    )
+                    .values(**values)
+                    .execution_options(synchronize_session=False)
+                )
+                held = result.rowcount == 1
+                if not held and db.session.get(SchedulerLease, self.name) is None:
+                    db.session.add(SchedulerLease(name=self.name, **values))
+                    db.session.flush()
+                    held = True
+                db.session.commit()
+                return held
+            except IntegrityError:
+                # Another worker created the row first
+                db.session.rollback()
+                return False
+    
+    def release(self):
+        with self.app.app_context():
+            db.session.execute(
+                update(SchedulerLease)
+                .where(SchedulerLease.name == self.name, SchedulerLease.holder == self.holder)
+                .values(expires_at=datetime.utcnow())
+                .execution_options(synchronize_session=False)
+            )
+            db.session.commit()
+
+class AdvisoryLockLease:
+    """Leader lease held as a PostgreSQL session advisory lock.
+    
+    The lock lives as long as its connection, which is kept out of the
+    pool; heartbeats check the connection is still alive. If the worker
+    dies the server ends the session and releases the lock.
+    """
+    
+    kind = 'advisory'
+    
+    def __init__(self, app, holder, ttl, key=ADVISORY_LOCK_KEY):
+        self.app = app
+        self.holder = holder
+        self.ttl = ttl
+        self.key = key
+        self.connection = None
+    
+    def acquire(self):
+        try:
+            if self.connection is not None:
+                self.connection.scalar(text('SELECT 1'))
+                self.connection.commit()
+                return True
+            
+            with self.app.app_context():
+                connection = db.engine.connect()
+            held = connection.scalar(text('SELECT pg_try_advisory_lock(:key)'), {'key': self.key})
+            # Session-level locks outlive the transaction; do not sit idle in one
+            connection.commit()
+            if not held:
+                connection.close()
+                return False
+            self.connection = connection
+            return True
+        except SQLAlchemyError as e:
+            logging.warning(f"Scheduler lease connection failed: {str(e)}")
+            self._discard()
+            return False
+    
+    def _discard(self):
+        # Never return a connection that may still hold the lock to the pool
+        if self.connection is not None:
+            try:
+                self.connection.invalidate()
+            except SQLAlchemyError:
+                pass
+            self.connection = None
+    
+    def release(self):
+        if self.connection is None:
+            return
+        try:
+            self.connection.scalar(text('SELECT pg_advisory_unlock(:key)'), {'key': self.key})
+            self.connection.commit()
+            self.connection.close()
+            self.connection = None
+        except SQLAlchemyError:
+            self._discard()
+
+def make_lease(app, holder, ttl):
+    """Return an advisory-lock lease on PostgreSQL and a table lease elsewhere."""
+    with app.app_context():
+        dialect = db.engine.dialect.name
+    lease_class = AdvisoryLockLease if dialect == 'postgresql' else TableLease
+    return lease_class(app, holder, ttl)
+
+def _utc(moment):
+    """Convert a naive local time to naive UTC, as stored in the database."""
+    return moment.astimezone(timezone.utc).replace(tzinfo=None)
+
+def _isoformat(value):
+    return value.isoformat() if value else None
+
+class ScheduledTaskSpec:
+    __slots__ = ('name', 'schedules', 'func', 'last_slot')
+    
+    def __init__(self, name, schedules, func):
+        self.name = name
+        self.schedules = schedules
+        self.func = func
+        # Latest slot this worker has tried to claim
+        self.last_slot = None
+    
+    def due_slot(self, now, window):
+        slots = [schedule.latest(now, window) for schedule in self.schedules]
+        return max((slot for slot in slots if slot is not None), default=None)
+
+class Scheduler:
+    """Fire tasks on their cron schedules while this worker holds the lease.
+    
+    A heartbeat thread takes or renews the lease; the scheduling thread
+    checks once per tick for due slots and runs claimed tasks inline, one
+    at a time, so a slow scrape never overlaps the next one from the
+    same leader. Slots missed while a task ran are coalesced into one.
+    """
+    
+    def __init__(self, app, lease, tasks, tick=1.0):
+        self.app = app
+        self.lease = lease
+        self.tasks = tasks
+        self.tick = tick
+        self.holder = lease.holder
+        self.heartbeat_interval = max(1.0, lease.ttl / 3)
+        self.misfire_grace = timedelta(seconds=max(MISFIRE_GRACE_SECONDS, 2 * lease.ttl))
+        self.leader = threading.Event()
+        self.running = None
+        self._stopped = threading.Event()
+        self._threads = []
+    
+    def start(self):
+        for target, name in ((self._heartbeat, 'scheduler-heartbeat'), (self._run, 'scheduler')):
+            thread = threading.Thread(target=target, name=name, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        atexit.register(self.stop)
+        return self
+    
+    def stop(self):
+        """Stop scheduling and hand the lease over without waiting for it to expire."""
+        if self._stopped.is_set():
+            return
+        self._stopped.set()
+        self._threads[0].join(timeout=self.heartbeat_interval + 5)
+        self.leader.clear()
+        try:
+            self.lease.release()
+        except SQLAlchemyError as e:
+            logging.warning(f"Could not release scheduler lease: {str(e)}")
+    
+    def _heartbeat(self):
+        while not self._stopped.is_set():
+            try:
+                held = self.lease.acquire()
+            except SQLAlchemyError as e:
+                logging.warning(f"Scheduler heartbeat failed: {str(e)}")
+                held = False
+            if held and not self.leader.is_set():
+                logging.info(f"Scheduler {self.holder} is now the leader ({self.lease.kind} lease)")
+                self.leader.set()
+            elif not held and self.leader.is_set():
+                logging.warning(f"Scheduler {self.holder} lost the lease")
+                self.leader.clear()
+            self._stopped.wait(self.heartbeat_interval)
+    
+    def _run(self):
+        while not self._stopped.wait(self.tick):
+            if not self.leader.is_set():
+                continue
+            now = datetime.now()
+            for task in self.tasks:
+                slot = task.due_slot(now, self.misfire_grace)
+                if slot is None or slot == task.last_slot:
+                    continue
+                task.last_slot = slot
+                try:
+                    if self.claim(task.name, _utc(slot)):
+                        self.execute(task, _utc(slot))
+                except SQLAlchemyError as e:
+                    logging.error(f"Could not claim scheduled task {task.name}: {str(e)}")
+    
+    def claim(self, name, due_at):
+        """Record that this worker runs the slot due at due_at; False if another did."""
+        with self.app.app_context():
+            try:
+                if db.session.get(ScheduledTask, name) is None:
+                    db.session.add(ScheduledTask(name=name))
+                    db.session.commit()
+            except IntegrityError:
+                db.session.rollback()
+            
+            result = db.session.execute(
+                update(ScheduledTask)
+                .where(
+                    ScheduledTask.name == name,
+                    or_(ScheduledTask.due_at.is_(None), ScheduledTask.due_at < due_at)
+                )
+                .values(holder=self.holder, due_at=due_at, started_at=datetime.utcnow(), finished_at=None, error=None)
+                .execution_options(synchronize_session=False)
+            )
+            db.session.commit()
+            return result.rowcount == 1
+    
+    def execute(self, task, due_at):
+        logging.info(f"Running scheduled task {task.name} (due {due_at:%Y-%m-%d %H:%M} UTC)")
+        self.running = task.name
+        error = None
+        try:
+            task.func(self.app)
+        except Exception as e:
+            error = str(e)
+            logging.error(f"Scheduled task {task.name} failed: {error}")
+        finally:
+            self.running = None
+        
+        with self.app.app_context():
+            db.session.execute(
+                update(ScheduledTask)
+                .where(ScheduledTask.name == task.name, ScheduledTask.holder == self.holder,
+                       ScheduledTask.due_at == due_at)
+                .values(finished_at=datetime.utcnow(), error=error)
+                .execution_options(synchronize_session=False)
+            )
+            db.session.commit()
+    
+    def status(self):
+        """Leadership of this worker and the last claimed slot of every task."""
+        rows = {row.name: row for row in db.session.scalars(select(ScheduledTask))}
+        tasks = {}
+        for task in self.tasks:
+            row = rows.get(task.name)
+            tasks[task.name] = {
+                'schedule': [schedule.expression for schedule in task.schedules],
+                'due_at': _isoformat(row and row.due_at),
+                'holder': row and row.holder,
+                'started_at': _isoformat(row and row.started_at),
+                'finished_at': _isoformat(row and row.finished_at),
+                'error': row and row.error,
+            }
+        return {
+            'holder': self.holder,
+            'leader': self.leader.is_set(),
+            'lease': self.lease.kind,
+            'running': self.running,
+            'tasks': tasks,
+        }
+
+def start_scheduler(app, tasks):
+    """Start the app's scheduler for {name: (schedule, func(app))}.
+    
+    Schedules are ';'-separated cron expressions; tasks with an empty one
+    are not scheduled. Starting twice returns the running scheduler.
+    """
+    if 'scheduler' in app.extensions:
+        return app.extensions['scheduler']
+    
+    specs = []
+    for name, (schedule, func) in tasks.items():
+        schedules = parse_schedules(schedule)
+        if schedules:
+            specs.append(ScheduledTaskSpec(name, schedules, func))
+    
+    holder = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+    lease = make_lease(app, holder, app.config.get('SCHEDULER_LEASE_TTL', 30))
+    scheduler = Scheduler(app, lease, specs)
+    app.extensions['scheduler'] = scheduler
+    return scheduler.start()
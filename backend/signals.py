@@ -0,0 +1,24 @@
+import itertools
+import threading
+from blinker import Namespace
+
+_signals = Namespace()
+
+# Sent with the app as sender after any commit that changed the jobs table.
+# Receivers get reason= ('scrape', 'add', 'delete', 'bulk', 'clear', ...),
+# plus the affected jobs as Job.to_dict() dicts in added=/removed= when the
+# sender knows them; None means receivers should reload.
+jobs_changed = _signals.signal('jobs-changed')
+
+_versions = itertools.count(1)
+_version_lock = threading.Lock()
+
+def dataset_version(app):
+    """Return the app's in-process dataset version, bumped on every change."""
+    return app.extensions.get('dataset_version', 0)
+
+def notify_jobs_changed(app, reason, added=None, removed=None):
+    """Bump the dataset version and tell receivers the jobs table changed."""
+    with _version_lock:
+        app.extensions['dataset_version'] = next(_versions)
+    jobs_changed.send(app, reason=reason, added=added, removed=removed)
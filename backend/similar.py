@@ -0,0 +1,302 @@
+import logging
+import math
+import re
+import threading
+import time
+import zlib
+from collections import Counter
+from functools import lru_cache
+from sqlalchemy import select
+from models import db, Job
+from signals import jobs_changed
+
+# "More like this" for GET /jobs/<id>/similar. Every active job is a hashed
+# TF-IDF vector over the words of its title, tags and cleaned description
+# (plus title bigrams), L2-normalized so a dot product is the cosine
+# similarity. Vectors live in a scipy sparse matrix in both row (CSR) and
+# column (CSC) form: a query takes its own row, keeps its highest-weighted
+# terms and multiplies only those columns, so the work is proportional to
+# the postings of a few dozen terms rather than to the number of jobs.
+#
+# Jobs added between rebuilds are vectorized with the IDF of the last
+# rebuild and kept in a small pending matrix that is scored separately and
+# folded into the main one every PENDING_LIMIT rows. numpy and scipy are
+# optional; without them the endpoint answers 501.
+
+HASH_BITS = 18
+DIMENSIONS = 1 << HASH_BITS
+
+# Terms of the query vector that are scored, highest weight first
+QUERY_TERMS = 48
+
+# Rows added since the last compaction before they are merged in
+PENDING_LIMIT = 2000
+
+# Term frequency multipliers per field
+FIELD_WEIGHTS = {'title': 3.0, 'tags': 2.0, 'description': 1.0}
+
+_WORD = re.compile(r'[a-z0-9]+')
+
+STOP_WORDS = frozenset("""
+a an and are as at be but by for from has have in is it its of on or our that the their this to we
+will with you your who what all any can more other such than into about also may not they us
+""".split())
+
+def similarity_available():
+    """Check whether the optional numpy and scipy dependencies are installed."""
+    try:
+        import numpy  # noqa: F401
+        import scipy.sparse  # noqa: F401
+        return True
+    except ImportError:
+        logging.warning("Similar jobs requested but numpy/scipy are not installed")
+        return False
+
+# Vocabulary is far smaller than the token stream, so most lookups hit
+@lru_cache(maxsize=1 << 18)
+def _feature(term):
+    return zlib.crc32(term.encode('utf-8')) & (DIMENSIONS - 1)
+
+def job_terms(title, tags, description):
+    """Return {feature: weighted count} for one job's text."""
+    counts = {}
+    for field, text in (('title', title), ('tags', tags), ('description', description)):
+        words = [word for word in _WORD.findall((text or '').lower()) if word not in STOP_WORDS]
+        terms = Counter(words)
+        if field == 'title':
+            terms.update(f'{first} {second}' for first, second in zip(words, words[1:]))
+        weight = FIELD_WEIGHTS[field]
+        for term, count in terms.items():
+            feature = _feature(term)
+            counts[feature] = counts.get(feature, 0) + weight * count
+    return counts
+
+class SimilarityIndex:
+    """Hashed TF-IDF vectors of the active jobs, kept in step with the jobs table.
+    
+    Adds and deletes that carry the affected jobs are applied
+    incrementally; changes without them mark the index stale and it is
+    rebuilt on next use. An index older than max_age keeps answering
+    while a background thread rebuilds it with fresh IDF weights.
+    """
+    
+    def __init__(self, app, max_age=3600):
+        self.app = app
+        self.max_age = max_age
+        self.lock = threading.RLock()
+        self.built_at = None
+        self.ids = None
+        # Changes seen while a refresh reads the table, replayed onto its result
+        self.changes = None
+    
+    # Building
+    
+    def rebuild(self):
+        start = time.perf_counter()
+        with self.app.app_context():
+            rows = db.session.execute(
+                select(Job.id, Job.title, Job.tags, Job.description, Job.duplicate_of)
+                .where(Job.is_active.isnot(False))
+                .order_by(Job.id)
+            ).all()
+        self.load(rows)
+        logging.info(
+            f"Built similarity index over {len(rows)} jobs in "
+            f"{(time.perf_counter() - start) * 1000:.0f} ms"
+        )
+    
+    def load(self, rows):
+        """Build the index from (id, title, tags, description, duplicate_of) rows."""
+        import numpy as np
+        
+        terms = [job_terms(title, tags, description) for _, title, tags, description, _ in rows]
+        features = np.fromiter(
+            (feature for counts in terms for feature in counts), dtype=np.int64,
+            count=sum(len(counts) for counts in terms)
+        )
+        document_frequency = np.bincount(features, minlength=DIMENSIONS)
+        idf = (np.log((1 + len(rows)) / (1 + document_frequency)) + 1).astype(np.float32)
+        
+        vectors = [self._vector(counts, idf) for counts in terms]
+        ids = np.array([row[0] for row in rows], dtype=np.int64)
+        roots = np.array([row[4] or row[0] for row in rows], dtype=np.int64)
+        
+        with self.lock:
+            self.idf = idf
+            self._set_main(ids, roots, self._csr(vectors))
+            self.pending = []
+            self.pending_matrix = None
+            self.built_at = time.monotonic()
+            changes, self.changes = self.changes, None
+            for added, removed in changes or ():
+                self._apply(added, removed)
+    
+    def _vector(self, counts, idf):
+        """Return the (features, weights) of one job, L2-normalized."""
+        import numpy as np
+        
+        features = np.fromiter(counts.keys(), dtype=np.int32, count=len(counts))
+        weights = np.fromiter(counts.values(), dtype=np.float32, count=len(counts))
+        # Sublinear term frequency, so long descriptions do not swamp the title
+        weights = (1 + np.log(weights)) * idf[features]
+        norm = math.sqrt(float(weights @ weights)) or 1.0
+        return features, weights / norm
+    
+    def _csr(self, vectors):
+        import numpy as np
+        from scipy.sparse import csr_matrix
+        
+        lengths = [len(features) for features, _ in vectors]
+        indptr = np.zeros(len(vectors) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=indptr[1:])
+        indices = np.concatenate([features for features, _ in vectors]) if vectors else np.zeros(0, np.int32)
+        data = np.concatenate([weights for _, weights in vectors]) if vectors else np.zeros(0, np.float32)
+        return csr_matrix((data, indices, indptr), shape=(len(vectors), DIMENSIONS))
+    
+    def _set_main(self, ids, roots, rows):
+        import numpy as np
+        
+        self.ids = ids
+        self.roots = roots
+        self.alive = np.ones(len(ids), dtype=bool)
+        self.rows = rows
+        self.columns = rows.tocsc()
+        self.position = {int(job_id): i for i, job_id in enumerate(ids)}
+    
+    def _compact(self):
+        """Fold the pending rows into the main matrices."""
+        import numpy as np
+        from scipy.sparse import vstack
+        
+        alive = self.alive
+        ids = np.concatenate([self.ids, [job_id for job_id, _, _ in self.pending]]).astype(np.int64)
+        roots = np.concatenate([self.roots, [root for _, root, _ in self.pending]]).astype(np.int64)
+        rows = vstack([self.rows, self._csr([vector for _, _, vector in self.pending])], format='csr')
+        
+        # Drop deleted rows while rewriting anyway
+        keep = np.concatenate([alive, np.ones(len(self.pending), dtype=bool)])
+        self._set_main(ids[keep], roots[keep], rows[keep])
+        self.pending = []
+        self.pending_matrix = None
+    
+    def _ensure_current(self):
+        if self.built_at is None:
+            self.rebuild()
+        elif time.monotonic() - self.built_at > self.max_age and self.changes is None:
+            # Keep answering from the current vectors while new IDF weights are computed
+            self.changes = []
+            threading.Thread(target=self._refresh, name='similar-refresh', daemon=True).start()
+    
+    def _refresh(self):
+        try:
+            self.rebuild()
+        except Exception as e:
+            logging.error(f"Error refreshing similarity index: {str(e)}")
+            with self.lock:
+                self.changes = None
+    
+    # Incremental updates
+    
+    def add(self, jobs):
+        """Index newly visible jobs, given as Job.to_dict() dicts."""
+        with self.lock:
+            pending_ids = {job_id for job_id, _, _ in self.pending}
+            for job in jobs:
+                position = self.position.get(job['id'])
+                if position is not None:
+                    self.alive[position] = True
+                    continue
+                if job['id'] in pending_ids:
+                    continue
+                counts = job_terms(job.get('title'), ', '.join(job.get('tags') or []), job.get('description'))
+                self.pending.append((job['id'], job.get('duplicate_of') or job['id'], self._vector(counts, self.idf)))
+            self.pending_matrix = None
+            if len(self.pending) >= PENDING_LIMIT:
+                self._compact()
+    
+    def remove(self, job_ids):
+        with self.lock:
+            for job_id in job_ids:
+                position = self.position.get(job_id)
+                if position is not None:
+                    self.alive[position] = False
+            removed = set(job_ids)
+            if any(job_id in removed for job_id, _, _ in self.pending):
+                self.pending = [entry for entry in self.pending if entry[0] not in removed]
+                self.pending_matrix = None
+    
+    def _apply(self, added, removed):
+        if added is None and removed is None:
+            # Rebuild on next use
+            self.built_at = None
+            return
+        if removed:
+            self.remove([job['id'] for job in removed])
+        if added:
+            self.add(added)
+    
+    def _on_jobs_changed(self, app, reason, added=None, removed=None, **kwargs):
+        with self.lock:
+            if self.built_at is None:
+                return
+            if self.changes is not None:
+                self.changes.append((added, removed))
+            try:
+                self._apply(added, removed)
+            except Exception as e:
+                logging.error(f"Error updating similarity index: {str(e)}")
+                self.built_at = None
+    
+    # Queries
+    
+    def _query_vector(self, job):
+        """The job's stored vector, or one computed from its row if it is not indexed."""
+        position = self.position.get(job.id)
+        if position is not None:
+            row = self.rows[position]
+            return row.indices, row.data
+        for job_id, _, vector in self.pending:
+            if job_id == job.id:
+                return vector
+        return self._vector(job_terms(job.title, job.tags, job.description), self.idf)
+    
+    def similar(self, job, limit=10):
+        """Return up to limit (job id, score) pairs most similar to a Job, best first.
+        
+        The job itself and members of its near-duplicate cluster are left out.
+        """
+        import numpy as np
+        from scipy.sparse import csc_matrix
+        
+        with self.lock:
+            self._ensure_current()
+            features, weights = self._query_vector(job)
+            if len(features) > QUERY_TERMS:
+                top = np.argpartition(weights, -QUERY_TERMS)[-QUERY_TERMS:]
+                features, weights = features[top], weights[top]
+            
+            scores = self.columns[:, features] @ weights
+            ids, roots, alive = self.ids, self.roots, self.alive
+            if self.pending:
+                if self.pending_matrix is None:
+                    self.pending_matrix = csc_matrix(self._csr([vector for _, _, vector in self.pending]))
+                scores = np.concatenate([scores, self.pending_matrix[:, features] @ weights])
+                ids = np.concatenate([ids, [job_id for job_id, _, _ in self.pending]])
+                roots = np.concatenate([roots, [root for _, root, _ in self.pending]])
+                alive = np.concatenate([alive, np.ones(len(self.pending), dtype=bool)])
+        
+        root = job.duplicate_of or job.id
+        scores[~alive | (roots == root) | (ids == job.id)] = 0
+        
+        candidates = np.flatnonzero(scores > 0)
+        if len(candidates) > limit:
+            candidates = candidates[np.argpartition(scores[candidates], -limit)[-limit:]]
+        candidates = candidates[np.argsort(-scores[candidates], kind='stable')]
+        return [(int(ids[i]), float(scores[i])) for i in candidates]
+
+def init_similar_index(app):
+    """Create the app's similarity index and keep it updated on ingest."""
+    index = SimilarityIndex(app, max_age=app.config.get('SIMILAR_MAX_AGE', 3600))
+    app.extensions['similar_jobs'] = index
+    jobs_changed.connect(index._on_jobs_changed, sender=app, weak=False)
+    return index
@@ -0,0 +1,20 @@
+import os
+from sources.base import REQUEST_HEADERS, Source, parse_source_datetime
+from sources.actuarylist import ActuaryListSource
+
+# Job boards the scrapers can crawl, by the name stored in jobs.source. A
+# new board is a Source subclass in this package, registered here.
+SOURCES = {source.name: source for source in (ActuaryListSource,)}
+
+DEFAULT_SOURCE = ActuaryListSource.name
+
+def get_source(name):
+    """Return the named source, configured from the environment."""
+    if name not in SOURCES:
+        raise ValueError(f"Unknown source: {name}")
+    return SOURCES[name].from_env()
+
+def enabled_sources():
+    """Return the sources listed in SCRAPE_SOURCES (default: actuarylist)."""
+    names = [name.strip() for name in os.getenv('SCRAPE_SOURCES', DEFAULT_SOURCE).split(',') if name.strip()]
+    return [get_source(name) for name in names]
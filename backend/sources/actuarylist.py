@@ -0,0 +1,183 @@
+import json
+import logging
+import os
+import re
+from sources.base import Source, parse_source_datetime
+
+# actuarylist.com is a Next.js site: every listing page embeds its jobs as
+# JSON in the __NEXT_DATA__ script, so pages are parsed without a browser.
+
+BASE_URL = os.getenv('ACTUARYLIST_BASE_URL', 'https://www.actuarylist.com').rstrip('/')
+
+def listing_urls(pages=1, base_url=None):
+    """Return the listing page URLs to crawl, first page without a query."""
+    base_url = (base_url or BASE_URL).rstrip('/')
+    return [f"{base_url}/"] + [f"{base_url}/?page={page}" for page in range(2, pages + 1)]
+
+def extract_json_data(html_content, save_debug=False):
+    """Extract job listings JSON data from HTML content.
+    
+    With save_debug the parsed JSON is also written to the working
+    directory for inspection.
+    """
+    logging.info("Extracting JSON data from HTML")
+    
+    from bs4 import BeautifulSoup
+    
+    try:
+        # Parse with BeautifulSoup
+        soup = BeautifulSoup(html_content, 'html.parser')
+        
+        # Find script tags with JSON data
+        json_scripts = soup.find_all('script', type="application/json")
+        logging.info(f"Found {len(json_scripts)} JSON script tags")
+        
+        if json_scripts:
+            # Process each JSON script
+            for i, script in enumerate(json_scripts):
+                try:
+                    # Extract the JSON content
+                    json_content = script.string
+                    if json_content:
+                        # Try to parse as JSON
+                        json_data = json.loads(json_content)
+                        
+                        # Save the full JSON for reference
+                        if save_debug:
+                            with open(f"job_data_full_{i}.json", "w", encoding="utf-8") as f:
+                                json.dump(json_data, f, indent=2)
+                        
+                        # Check if this contains job data
+                        if "props" in json_data and "pageProps" in json_data["props"]:
+                            page_props = json_data["props"]["pageProps"]
+                            
+                            # Check for job count
+                            if "jobCount" in page_props:
+                                job_count = page_props["jobCount"]
+                                logging.info(f"Found job count: {job_count}")
+                            
+                            # Check for filtered jobs
+                            if "filteredJobs" in page_props:
+                                filtered_jobs = page_props["filteredJobs"]
+                                logging.info(f"Found {len(filtered_jobs)} filtered jobs")
+                                return filtered_jobs
+                except Exception as e:
+                    logging.error(f"Error processing JSON script {i}: {str(e)}")
+        
+        # If we couldn't find JSON data in script tags, try to find it in the page content
+        logging.info("Trying to find JSON data in page content")
+        
+        # Look for patterns that might indicate JSON data
+        json_pattern = re.compile(r'<script id="__NEXT_DATA__" type="application/json">(.*?)</script>', re.DOTALL)
+        match = json_pattern.search(html_content)
+        
+        if match:
+            try:
+                json_content = match.group(1)
+                json_data = json.loads(json_content)
+                
+                # Save the full JSON for reference
+                if save_debug:
+                    with open("next_data_full.json", "w", encoding="utf-8") as f:
+                        json.dump(json_data, f, indent=2)
+                
+                # Try to find job data in the JSON
+                if "props" in json_data and "pageProps" in json_data["props"]:
+                    page_props = json_data["props"]["pageProps"]
+                    
+                    # Check for filtered jobs
+                    if "filteredJobs" in page_props:
+                        filtered_jobs = page_props["filteredJobs"]
+                        logging.info(f"Found {len(filtered_jobs)} filtered jobs in __NEXT_DATA__")
+                        return filtered_jobs
+            except Exception as e:
+                logging.error(f"Error processing __NEXT_DATA__ JSON: {str(e)}")
+    
+    except Exception as e:
+        logging.error(f"Error during JSON extraction: {str(e)}")
+    
+    return None
+
+def normalize_job(job, base_url=None):
+    """Map one source listing onto Job fields, or return None if unusable."""
+    base_url = (base_url or BASE_URL).rstrip('/')
+    
+    # Extract job details based on the actual JSON structure
+    job_id = job.get("id")
+    
+    # Extract title - it should be directly in the job object
+    title = job.get("title")
+    if not title or title == "Unknown Title":
+        # Try to find title in other fields
+        if "position" in job:
+            title = job["position"]
+        elif "name" in job:
+            title = job["name"]
+    if not title:
+        logging.warning(f"Skipping listing {job_id} without a title")
+        return None
+    
+    # Extract company - it might be nested or a direct field
+    company = "Unknown Company"
+    company_data = job.get("company")
+    if isinstance(company_data, dict) and "name" in company_data:
+        company = company_data["name"]
+    elif isinstance(company_data, str):
+        company = company_data
+    
+    # Extract location - it might be nested or a direct field
+    location = "Unknown Location"
+    location_data = job.get("location")
+    if isinstance(location_data, dict) and "name" in location_data:
+        location = location_data["name"]
+    elif isinstance(location_data, str):
+        location = location_data
+    elif job.get("cities") or job.get("countries") or job.get("country"):
+        location = listing_location(job)
+    
+    # Build URL
+    url = f"{base_url}/jobs/{job_id}" if job_id else f"{base_url}/"
+    
+    # Cut to the column sizes, so one oversized listing cannot fail its staging batch
+    return {
+        "title": str(title)[:200],
+        "company": str(company)[:100],
+        "location": str(location)[:100],
+        "description_html": job.get("description") or "",
+        "url": url[:500],
+        "tags": listing_tags(job),
+        "is_active": job.get("is_active") is not False,
+        "created_at": parse_source_datetime(job.get("created_at")),
+    }
+
+def listing_tags(job):
+    """Join a listing's tags into the stored "Pricing, Python" form."""
+    tags = [tag.strip() for tag in job.get("tags") or [] if isinstance(tag, str) and tag.strip()]
+    return ", ".join(tags)[:500] or None
+
+def listing_location(job):
+    """Build "St Albans / Hybrid, UK" from a listing's cities and country."""
+    cities = [city for city in job.get("cities") or [] if isinstance(city, str) and city.strip()]
+    countries = job.get("countries")
+    country = countries.get("label") if isinstance(countries, dict) else None
+    country = country or job.get("country")
+    
+    location = " / ".join(cities)
+    if country:
+        location = f"{location}, {country}" if location else country
+    return location[:100] or "Unknown Location"
+
+class ActuaryListSource(Source):
+    name = 'actuarylist'
+    default_base_url = BASE_URL
+    rate_limit = 2.0
+    concurrency = 4
+    
+    def listing_urls(self):
+        return listing_urls(self.pages, self.base_url)
+    
+    def extract(self, html_content):
+        return extract_json_data(html_content) or []
+    
+    def normalize(self, listing):
+        return normalize_job(listing, self.base_url)
@@ -0,0 +1,87 @@
+import os
+from datetime import datetime, timezone
+
+# Use a realistic user agent
+REQUEST_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+}
+
+def parse_source_datetime(value):
+    """Parse an ISO 8601 timestamp from the source into naive UTC."""
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return None
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+class Source:
+    """A job board the pipeline can crawl.
+    
+    Subclasses set `name` (stored in jobs.source) and `default_base_url`
+    and implement extract() and normalize(). Instances only hold plain
+    settings, so they can be sent to the parse process pool.
+    
+    Settings default to the class attributes and can be overridden per
+    source from the environment, e.g. for `name = 'actuarylist'`:
+    ACTUARYLIST_BASE_URL, ACTUARYLIST_PAGES (falling back to SCRAPE_PAGES),
+    ACTUARYLIST_RATE_LIMIT and ACTUARYLIST_CONCURRENCY.
+    """
+    
+    name = None
+    default_base_url = None
+    # Requests per second across all of this source's fetchers; 0 is unlimited
+    rate_limit = 1.0
+    # Pages of this source fetched at the same time
+    concurrency = 2
+    
+    def __init__(self, base_url=None, pages=1, rate_limit=None, concurrency=None):
+        self.base_url = (base_url or self.default_base_url).rstrip('/')
+        self.pages = pages
+        if rate_limit is not None:
+            self.rate_limit = rate_limit
+        if concurrency is not None:
+            self.concurrency = concurrency
+    
+    @classmethod
+    def from_env(cls):
+        prefix = cls.name.upper()
+        rate_limit = os.getenv(f'{prefix}_RATE_LIMIT')
+        concurrency = os.getenv(f'{prefix}_CONCURRENCY')
+        return cls(
+            base_url=os.getenv(f'{prefix}_BASE_URL'),
+            pages=int(os.getenv(f'{prefix}_PAGES') or os.getenv('SCRAPE_PAGES', '1')),
+            rate_limit=float(rate_limit) if rate_limit else None,
+            concurrency=int(concurrency) if concurrency else None,
+        )
+    
+    def listing_urls(self):
+        """Return the listing page URLs to crawl."""
+        raise NotImplementedError
+    
+    def fetch(self, url, timeout=30):
+        """Fetch one listing page and return its HTML."""
+        import requests
+        
+        response = requests.get(url, headers=REQUEST_HEADERS, timeout=timeout)
+        response.raise_for_status()
+        return response.text
+    
+    def extract(self, html_content):
+        """Return the raw listings found in one page."""
+        raise NotImplementedError
+    
+    def normalize(self, listing):
+        """Map one raw listing onto Job fields, or return None if unusable.
+        
+        Returns a dict with title, company, location, description_html
+        (the full original description), url, tags (comma-separated, or
+        None), is_active and created_at.
+        """
+        raise NotImplementedError
+    
+    def __repr__(self):
+        return f'<{type(self).__name__} {self.base_url}>'
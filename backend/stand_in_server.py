@@ -0,0 +1,221 @@
+"""Local stand-in for actuarylist.com, for offline scrape runs.
+
+Serves the checked-in page captures and synthetic paginated
+__NEXT_DATA__ pages built from filtered_jobs.json, with configurable
+latency, error rate and page count:
+
+    python stand_in_server.py --port 8001 --pages 20 --latency 0.05
+    ACTUARYLIST_BASE_URL=http://127.0.0.1:8001 SCRAPE_PAGES=20 python app.py
+
+Routes:
+    /                      first listing page (see --first-page)
+    /?page=N               synthetic listing page N, 404 past --pages
+    /page_source.html      checked-in Selenium capture
+    /requests_page.html    checked-in requests capture
+"""
+import argparse
+import copy
+import json
+import os
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+CAPTURES = {
+    'page_source': 'page_source.html',
+    'requests_page': 'requests_page.html',
+}
+
+def load_template_jobs(path=None):
+    """Return the listings synthetic pages are generated from."""
+    with open(path or os.path.join(HERE, 'filtered_jobs.json'), encoding='utf-8') as f:
+        return json.load(f)
+
+def synthetic_jobs(templates, page, jobs_per_page):
+    """Listings for one synthetic page, distinct across pages.
+    
+    Each listing gets a unique id and a reference line appended to its
+    description, so every one fingerprints differently and is stored.
+    """
+    jobs = []
+    for i in range(jobs_per_page):
+        job_id = 1_000_000 + (page - 1) * jobs_per_page + i
+        job = copy.deepcopy(templates[i % len(templates)])
+        job["id"] = job_id
+        job["description"] = f"{job.get('description') or ''}<p>Reference {job_id}</p>"
+        jobs.append(job)
+    return jobs
+
+def render_page(jobs, page):
+    """Wrap listings in a minimal page with a __NEXT_DATA__ script."""
+    data = {"props": {"pageProps": {"jobCount": len(jobs), "page": page, "filteredJobs": jobs}}}
+    # Escape "</" so description markup cannot close the script tag early
+    payload = json.dumps(data).replace('</', '<\\/')
+    return (
+        '<!DOCTYPE html><html><head><title>Actuary List</title></head><body>'
+        f'<script id="__NEXT_DATA__" type="application/json">{payload}</script>'
+        '</body></html>'
+    )
+
+class StandInServer:
+    """Threaded HTTP server impersonating the listing site.
+    
+    Synthetic pages are rendered once up front so that serving them costs
+    no CPU in the process being measured. Latency and errors are drawn
+    from a seeded generator for repeatable runs.
+    """
+    
+    def __init__(self, host='127.0.0.1', port=0, pages=10, jobs_per_page=30,
+                 latency=0.0, jitter=0.0, error_rate=0.0, first_page='synthetic', seed=0):
+        if first_page != 'synthetic' and first_page not in CAPTURES:
+            raise ValueError(f"Unknown first page: {first_page}")
+        self.pages = pages
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.requests = 0
+        self.errors = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        
+        self._captures = {}
+        for filename in CAPTURES.values():
+            with open(os.path.join(HERE, filename), encoding='utf-8') as f:
+                self._captures[f'/{filename}'] = f.read()
+        
+        templates = load_template_jobs()
+        self._pages = {
+            page: render_page(synthetic_jobs(templates, page, jobs_per_page), page)
+            for page in range(1, pages + 1)
+        }
+        if first_page != 'synthetic':
+            self._pages[1] = self._captures[f'/{CAPTURES[first_page]}']
+        
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = None
+    
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+    
+    def _delay_and_fail(self):
+        """Sleep for the configured latency and decide whether to fail."""
+        with self._lock:
+            self.requests += 1
+            delay = self.latency + self._random.uniform(0, self.jitter)
+            fail = self._random.random() < self.error_rate
+            if fail:
+                self.errors += 1
+        if delay:
+            time.sleep(delay)
+        return fail
+    
+    def body_for(self, path):
+        """Return the HTML served at path, or None for a 404."""
+        url = urlsplit(path)
+        if url.path in self._captures:
+            return self._captures[url.path]
+        if url.path != '/':
+            return None
+        try:
+            page = int(parse_qs(url.query).get('page', ['1'])[0])
+        except ValueError:
+            return None
+        return self._pages.get(page)
+    
+    def _handler_class(self):
+        server = self
+        
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            
+            def do_GET(self):
+                if server._delay_and_fail():
+                    self._send(503, 'Service Unavailable')
+                    return
+                body = server.body_for(self.path)
+                if body is None:
+                    self._send(404, 'Not Found')
+                else:
+                    self._send(200, body)
+            
+            def _send(self, status, body):
+                encoded = body.encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'text/html; charset=utf-8')
+                self.send_header('Content-Length', str(len(encoded)))
+                self.end_headers()
+                self.wfile.write(encoded)
+            
+            def log_message(self, format, *args):
+                pass
+        
+        return Handler
+    
+    def serve_forever(self):
+        try:
+            self._server.serve_forever()
+        finally:
+            self._server.server_close()
+    
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+    
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread:
+            self._thread.join()
+    
+    def __enter__(self):
+        return self.start()
+    
+    def __exit__(self, *exc_info):
+        self.stop()
+
+def add_server_arguments(parser):
+    """Options shared by this script and bench_scrape.py."""
+    parser.add_argument('--pages', type=int, default=10, help='listing pages served')
+    parser.add_argument('--jobs-per-page', type=int, default=30, help='listings per synthetic page')
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds added to every response')
+    parser.add_argument('--jitter', type=float, default=0.0, help='extra random latency, up to this many seconds')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='fraction of requests answered with 503')
+    parser.add_argument('--first-page', default='synthetic', choices=['synthetic', *CAPTURES],
+                        help='what / serves')
+    parser.add_argument('--seed', type=int, default=0, help='seed for latency jitter and errors')
+
+def server_from_args(args, port=0):
+    return StandInServer(
+        port=port,
+        pages=args.pages,
+        jobs_per_page=args.jobs_per_page,
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        first_page=args.first_page,
+        seed=args.seed,
+    )
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--port', type=int, default=8001)
+    add_server_arguments(parser)
+    args = parser.parse_args()
+    
+    server = server_from_args(args, port=args.port)
+    print(f"Serving {args.pages} listing pages at {server.base_url}/")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == '__main__':
+    main()
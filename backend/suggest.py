@@ -0,0 +1,133 @@
+import heapq
+import logging
+import threading
+import time
+from bisect import bisect_left, insort
+from sqlalchemy import func, select
+from models import db, Job
+from signals import jobs_changed
+
+SUGGEST_FIELDS = {
+    'company': Job.company,
+    'location': Job.location,
+}
+
+class PrefixIndex:
+    """Sorted array of distinct values with job counts, searched by prefix.
+    
+    Keys are (lowercase value, value) tuples, so a bisect finds the first
+    case-insensitive prefix match and the matches follow contiguously.
+    """
+    
+    def __init__(self, counts=None):
+        self.counts = dict(counts or {})
+        self.keys = sorted((value.lower(), value) for value in self.counts)
+    
+    def add(self, value, count=1):
+        if not value:
+            return
+        if value not in self.counts:
+            self.counts[value] = 0
+            insort(self.keys, (value.lower(), value))
+        self.counts[value] += count
+    
+    def remove(self, value, count=1):
+        if value not in self.counts:
+            return
+        self.counts[value] -= count
+        if self.counts[value] <= 0:
+            del self.counts[value]
+            key = (value.lower(), value)
+            position = bisect_left(self.keys, key)
+            if position < len(self.keys) and self.keys[position] == key:
+                del self.keys[position]
+    
+    def suggest(self, prefix, limit):
+        """Return up to limit (value, count) pairs, most jobs first."""
+        prefix = prefix.lower()
+        start = bisect_left(self.keys, (prefix,))
+        matches = []
+        for lower, value in self.keys[start:]:
+            if not lower.startswith(prefix):
+                break
+            matches.append(value)
+        
+        counts = self.counts
+        top = heapq.nsmallest(limit, matches, key=lambda value: (-counts[value], value.lower()))
+        return [(value, counts[value]) for value in top]
+
+class SuggestIndex:
+    """Per-field prefix indexes kept in step with the jobs table.
+    
+    Adds and deletes that carry the affected jobs are applied
+    incrementally; changes without them (bulk loads) mark the indexes
+    stale and the next request rebuilds them from one GROUP BY per field,
+    so suggestions never scan the jobs table.
+    """
+    
+    def __init__(self, app, max_age=300):
+        self.app = app
+        self.max_age = max_age
+        self.indexes = None
+        self.built_at = 0
+        self.lock = threading.Lock()
+        # Held while rebuilding, so concurrent requests share one rebuild
+        self.build_lock = threading.Lock()
+    
+    def rebuild(self):
+        with self.app.app_context():
+            indexes = {}
+            for field, column in SUGGEST_FIELDS.items():
+                rows = db.session.execute(
+                    select(column, func.count())
+                    .where(column.isnot(None), Job.is_active.isnot(False))
+                    .group_by(column)
+                )
+                indexes[field] = PrefixIndex({value: count for value, count in rows if value})
+        
+        with self.lock:
+            self.indexes = indexes
+            self.built_at = time.monotonic()
+    
+    def _is_stale(self):
+        return self.indexes is None or time.monotonic() - self.built_at > self.max_age
+    
+    def suggest(self, field, prefix, limit=10):
+        if self._is_stale():
+            with self.build_lock:
+                # Another request may have rebuilt it while this one waited
+                if self._is_stale():
+                    self.rebuild()
+        with self.lock:
+            return self.indexes[field].suggest(prefix, limit)
+    
+    def _apply(self, jobs, method):
+        with self.lock:
+            for job in jobs:
+                for field, index in self.indexes.items():
+                    getattr(index, method)(job.get(field))
+    
+    def _on_jobs_changed(self, app, reason, added=None, removed=None, **kwargs):
+        if self.indexes is None:
+            return
+        try:
+            if reason == 'clear':
+                with self.lock:
+                    self.indexes = {field: PrefixIndex() for field in SUGGEST_FIELDS}
+            elif added is None and removed is None:
+                # Rebuild on the next request
+                self.built_at = 0
+            else:
+                self._apply(added or [], 'add')
+                self._apply(removed or [], 'remove')
+        except Exception as e:
+            # Force a full rebuild on the next request instead
+            logging.error(f"Error updating suggestion index: {str(e)}")
+            self.indexes = None
+
+def init_suggest_index(app):
+    """Create the app's suggestion index and keep it updated on ingest."""
+    index = SuggestIndex(app, max_age=app.config.get('SUGGEST_MAX_AGE', 300))
+    app.extensions['suggest_index'] = index
+    jobs_changed.connect(index._on_jobs_changed, sender=app, weak=False)
+    return index
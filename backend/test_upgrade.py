@@ -0,0 +1,70 @@
+"""Upgrade path: rows scraped before scrape runs existed must expire.
+
+Run from backend/ with `python -m pytest test_upgrade.py`.
+"""
+import json
+import os
+import pytest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv('DATABASE_URL', f"sqlite:///{tmp_path / 'jobs.db'}")
+    from app import create_app
+    
+    app = create_app({'SCHEDULER_ENABLED': False, 'RETENTION_MISSED_SCRAPES': 1})
+    result = app.test_cli_runner().invoke(args=['init-db'])
+    assert result.exit_code == 0, result.output
+    return app
+
+def bundled_listings():
+    with open(os.path.join(HERE, 'job_data_full_0.json'), encoding='utf-8') as f:
+        return json.load(f)['props']['pageProps']['filteredJobs']
+
+def store_legacy_rows(app, listings):
+    """Store listings the way the scraper did before fingerprints and scrape runs."""
+    from models import db, Job
+    from descriptions import summarize_description
+    from sources.actuarylist import normalize_job
+    
+    with app.app_context():
+        for listing in listings:
+            job = normalize_job(listing)
+            db.session.add(Job(
+                title=job['title'], company=job['company'], location=job['location'], url=job['url'],
+                description=summarize_description(job['description_html']) if job['description_html'] else None,
+            ))
+        db.session.commit()
+
+def visible_jobs(app):
+    response = app.test_client().get('/jobs')
+    assert response.status_code == 200
+    return response.get_json()
+
+def test_legacy_rows_expire_after_first_scrape(app):
+    from models import db, Job
+    from ingest import process_job_data
+    from retention import compact_jobs
+    
+    listings = bundled_listings()
+    store_legacy_rows(app, listings)
+    result = app.test_cli_runner().invoke(args=['init-db'])
+    assert result.exit_code == 0, result.output
+    assert len(visible_jobs(app)) == len(listings)
+    
+    process_job_data(listings, app)
+    
+    # Only the rows stamped by the scrape stay visible
+    with app.app_context():
+        scraped = db.session.scalars(db.select(Job.id).where(Job.last_seen_scrape.isnot(None))).all()
+    assert sorted(job['id'] for job in visible_jobs(app)) == sorted(scraped)
+    assert 0 < len(scraped) <= len(listings)
+    
+    # and retention deletes the rest
+    with app.app_context():
+        deleted = compact_jobs(app)
+        legacy = db.session.scalar(db.select(db.func.count()).where(Job.last_seen_scrape.is_(None)))
+    assert deleted['missed_scrapes'] > 0
+    assert legacy == 0
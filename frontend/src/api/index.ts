@@ -3,6 +3,10 @@ import type { Job, JobFilters } from "../types"
 
 const API_URL = "http://localhost:5000"
 
+// Credentials are sent so the API's read-your-writes cookie keeps reads
+// right after an add or delete on the primary database
+const client = axios.create({ baseURL: API_URL, withCredentials: true })
+
 export const fetchJobs = async (filters: JobFilters = {}) => {
   try {
     const params = new URLSearchParams()
@@ -11,7 +15,7 @@ export const fetchJobs = async (filters: JobFilters = {}) => {
     if (filters.company) params.append("company", filters.company)
     if (filters.sort_by) params.append("sort_by", filters.sort_by)
 
-    const response = await axios.get(`${API_URL}/jobs`, { params })
+    const response = await client.get("/jobs", { params })
     return response.data
   } catch (error) {
     console.error("Error fetching jobs:", error)
@@ -19,9 +23,19 @@ export const fetchJobs = async (filters: JobFilters = {}) => {
   }
 }
 
+export const suggestValues = async (field: "company" | "location", prefix = "", limit = 10) => {
+  try {
+    const response = await client.get("/jobs/suggest", { params: { field, prefix, limit } })
+    return response.data.suggestions.map((suggestion: { value: string }) => suggestion.value) as string[]
+  } catch (error) {
+    console.error("Error fetching suggestions:", error)
+    throw error
+  }
+}
+
 export const addJob = async (job: Omit<Job, "id" | "date_posted">) => {
   try {
-    const response = await axios.post(`${API_URL}/jobs`, job)
+    const response = await client.post("/jobs", job)
     return response.data
   } catch (error) {
     console.error("Error adding job:", error)
@@ -31,7 +45,7 @@ export const addJob = async (job: Omit<Job, "id" | "date_posted">) => {
 
 export const deleteJob = async (id: number) => {
   try {
-    const response = await axios.delete(`${API_URL}/jobs/${id}`)
+    const response = await client.delete(`/jobs/${id}`)
     return response.data
   } catch (error) {
     console.error("Error deleting job:", error)
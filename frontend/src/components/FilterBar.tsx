@@ -2,7 +2,11 @@
 
 import { useState, useEffect } from "react"
 import type { JobFilters } from "../types"
-import { fetchJobs } from "../api"
+import { suggestValues } from "../api"
+
+// Suggestions shown per field, and the pause in typing before fetching them
+const SUGGESTION_LIMIT = 10
+const SUGGEST_DELAY_MS = 150
 
 interface FilterBarProps {
   filters: JobFilters
@@ -16,27 +20,24 @@ const FilterBar = ({ filters, onFilterChange }: FilterBarProps) => {
   const [company, setCompany] = useState(filters.company || "")
   const [sortBy, setSortBy] = useState(filters.sort_by || "date")
 
+  // Suggest values starting with what has been typed so far
   useEffect(() => {
-    // Fetch unique locations and companies for filter dropdowns
-    const fetchFilterOptions = async () => {
-      try {
-        const jobs = await fetchJobs()
-
-        // Extract unique locations
-        const uniqueLocations = Array.from(new Set(jobs.map((job: any) => job.location))).filter(Boolean)
-
-        // Extract unique companies
-        const uniqueCompanies = Array.from(new Set(jobs.map((job: any) => job.company))).filter(Boolean)
-
-        setLocations(uniqueLocations)
-        setCompanies(uniqueCompanies)
-      } catch (error) {
-        console.error("Error fetching filter options:", error)
-      }
-    }
+    const timer = setTimeout(() => {
+      suggestValues("location", location, SUGGESTION_LIMIT)
+        .then(setLocations)
+        .catch((error) => console.error("Error fetching location suggestions:", error))
+    }, SUGGEST_DELAY_MS)
+    return () => clearTimeout(timer)
+  }, [location])
 
-    fetchFilterOptions()
-  }, [])
+  useEffect(() => {
+    const timer = setTimeout(() => {
+      suggestValues("company", company, SUGGESTION_LIMIT)
+        .then(setCompanies)
+        .catch((error) => console.error("Error fetching company suggestions:", error))
+    }, SUGGEST_DELAY_MS)
+    return () => clearTimeout(timer)
+  }, [company])
 
   const handleApplyFilters = () => {
     onFilterChange({
@@ -64,33 +65,38 @@ const FilterBar = ({ filters, onFilterChange }: FilterBarProps) => {
           <label htmlFor="location" className="block text-sm font-medium text-gray-700 mb-1">
             Location
           </label>
-          <select
+          <input
             id="location"
-            className="select w-full"
+            className="input w-full"
+            list="location-suggestions"
+            placeholder="All Locations"
             value={location}
             onChange={(e) => setLocation(e.target.value)}
-          >
-            <option value="">All Locations</option>
+          />
+          <datalist id="location-suggestions">
             {locations.map((loc) => (
-              <option key={loc} value={loc}>
-                {loc}
-              </option>
+              <option key={loc} value={loc} />
             ))}
-          </select>
+          </datalist>
         </div>
 
         <div>
           <label htmlFor="company" className="block text-sm font-medium text-gray-700 mb-1">
             Company
           </label>
-          <select id="company" className="select w-full" value={company} onChange={(e) => setCompany(e.target.value)}>
-            <option value="">All Companies</option>
+          <input
+            id="company"
+            className="input w-full"
+            list="company-suggestions"
+            placeholder="All Companies"
+            value={company}
+            onChange={(e) => setCompany(e.target.value)}
+          />
+          <datalist id="company-suggestions">
             {companies.map((comp) => (
-              <option key={comp} value={comp}>
-                {comp}
-              </option>
+              <option key={comp} value={comp} />
             ))}
-          </select>
+          </datalist>
         </div>
 
         <div>